@@ -5,7 +5,7 @@ from app.cli import cli_commands
 from app.common.errors import CustomException
 
 from .config import config_by_name
-from .extensions import setup_jwt
+from .extensions import setup_cache, setup_jwt
 from .urls import urlpatterns
 
 
@@ -16,7 +16,10 @@ def _register_view(app, view, endpoint, url, methods):
 
 def create_app(config_name="dev"):
     from app.models import db
+    from app.common.background_tasks import background_tasks
     from app.common.mail import mail
+    from app.common.password_hasher import password_hasher
+    from app.common.rate_limiter import rate_limiter
 
     app = Flask(__name__)
 
@@ -26,6 +29,9 @@ def create_app(config_name="dev"):
     # Setup DB
     db.init_app(app)
 
+    # Setup caches
+    setup_cache(app)
+
     # Setup Flask-JWT-extended
     jwt = JWTManager(app)
     setup_jwt(jwt)
@@ -34,6 +40,15 @@ def create_app(config_name="dev"):
     # Setup Flask-Mail
     mail.init_app(app)
 
+    # Setup password hashing pool
+    password_hasher.init_app(app)
+
+    # Setup rate limiting
+    rate_limiter.init_app(app)
+
+    # Setup background tasks
+    background_tasks.init_app(app)
+
     # Setup custom error handler
     @app.errorhandler(CustomException)
     def handle_exception(e):
@@ -1,11 +1,11 @@
 from flask import jsonify, make_response, request
 from flask.views import MethodView
-from flask_jwt_extended import jwt_required
 
 from app.common.access_level import requires_access_level
+from app.common.access_token import jwt_required
 from app.models.user_model import Roles
 from app.services.action_card_services import (
-    get_all_action_cards,
+    get_action_cards_payload,
     get_coach_action_card_batches,
     update_coach_action_card_batches,
 )
@@ -15,8 +15,11 @@ class ActionCardListView(MethodView):
     @jwt_required
     @requires_access_level(Roles.COACH)
     def get(self):
-        response, code = get_all_action_cards()
-        return make_response(jsonify(response), code)
+        payload, etag = get_action_cards_payload()
+        response = make_response(payload, 200, {"Content-Type": "application/json"})
+        response.set_etag(etag)
+        # Answers 304 if the request has a matching If-None-Match
+        return response.make_conditional(request)
 
 
 class ActionCardBatchView(MethodView):
@@ -1,8 +1,8 @@
 from flask import jsonify, make_response, request
 from flask.views import MethodView
-from flask_jwt_extended import jwt_required
 
 from app.common.access_level import requires_access_level
+from app.common.access_token import jwt_required
 from app.models.user_model import Roles
 from app.services.coach_services import (
     create_coach,
@@ -16,8 +16,8 @@ class CoachListView(MethodView):
     @jwt_required
     @requires_access_level(Roles.COACH)
     def get(self):
-        response, code = get_all_coachs()
-        return make_response(jsonify(response), code)
+        response, code, headers = get_all_coachs(request.args.to_dict())
+        return make_response(jsonify(response), code, headers)
 
     @jwt_required
     @requires_access_level(Roles.ADMIN)
@@ -1,7 +1,8 @@
 from flask import jsonify, make_response, request
 from flask.views import MethodView
-from flask_jwt_extended import jwt_required
 
+from app.common.access_token import jwt_required
+from app.common.rate_limiter import rate_limited
 from app.services.user_services import (
     forgotten_password,
     get_me,
@@ -12,6 +13,7 @@ from app.services.user_services import (
 
 
 class LoginView(MethodView):
+    @rate_limited("login")
     def post(self):
         data = request.data
         response, code = login(data)
@@ -33,6 +35,7 @@ class UserMeView(MethodView):
 
 
 class ForgottenPasswordView(MethodView):
+    @rate_limited("forgotten_password")
     def post(self):
         data = request.data
         response, code = forgotten_password(data)
@@ -1,11 +1,12 @@
 from flask import jsonify, make_response, request
 from flask.views import MethodView
-from flask_jwt_extended import jwt_required
 
 from app.common.access_level import requires_access_level
+from app.common.access_token import jwt_required
 from app.models.user_model import Roles
 from app.services.workshop_participants_services import (
     add_participant,
+    add_participants,
     remove_participant,
 )
 from app.services.workshop_services import (
@@ -20,8 +21,8 @@ class WorkshopListView(MethodView):
     @jwt_required
     @requires_access_level(Roles.COACH)
     def get(self):
-        response, code = get_workshops()
-        return make_response(jsonify(response), code)
+        response, code, headers = get_workshops(request.args.to_dict())
+        return make_response(jsonify(response), code, headers)
 
     @jwt_required
     @requires_access_level(Roles.COACH)
@@ -62,3 +63,18 @@ class WorkshopParticipantListView(MethodView):
         data = request.data
         response, code = add_participant(workshop_id=workshop_id, data=data)
         return make_response(jsonify(response), code)
+
+
+class WorkshopParticipantBulkView(MethodView):
+    @jwt_required
+    @requires_access_level(Roles.COACH)
+    def post(self, workshop_id):
+        # Participants are either uploaded in a CSV file or sent as a JSON list
+        if "file" in request.files:
+            data, content_type = request.files["file"].read(), "text/csv"
+        else:
+            data, content_type = request.data, request.mimetype
+        response, code = add_participants(
+            workshop_id=workshop_id, data=data, content_type=content_type
+        )
+        return make_response(jsonify(response), code)
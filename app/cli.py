@@ -1,15 +1,24 @@
 import csv
+import datetime
 import json
 
 import click
+from flask import current_app
 from flask.cli import with_appcontext
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
 
+from app.common.cache.action_card_catalog import CATALOG_NAME
 from app.common.errors import CustomException
 from app.models import db
 from app.models.action_card_model import ActionCardBatchModel, ActionCardModel
+from app.models.carbon_forms_model import CarbonFormAnswersModel
+from app.models.catalog_version_model import CatalogVersionModel
 from app.models.city_model import Cities
 from app.models.model_model import Model
-from app.models.user_model import Roles
+from app.models.rate_limit_model import RateLimitCounterModel
+from app.models.user_model import BlacklistTokenModel, Roles, UserModel
+from app.models.workshop_model import PARTICIPANT_SNAPSHOT_FIELDS, WorkshopModel
 from app.services.coach_services import create_coach
 
 MODELS_WITH_ENABLED_IMPORTCSV = {
@@ -19,6 +28,52 @@ MODELS_WITH_ENABLED_IMPORTCSV = {
 
 MODELS_WITH_ENABLED_IMPORTJSON = {"models": Model}
 
+INDEXED_MODELS = [
+    UserModel,
+    BlacklistTokenModel,
+    WorkshopModel,
+    ActionCardModel,
+    ActionCardBatchModel,
+    Model,
+    CarbonFormAnswersModel,
+    RateLimitCounterModel,
+]
+
+# Queries run by the services, explained by ensure-indexes
+EXPLAINED_QUERIES = {
+    "UserModel.find_by_email": lambda: UserModel.objects(email=""),
+    "UserModel.find_coach_by_id": lambda: UserModel.objects(
+        userId="", role__in=[Roles.ADMIN.value, Roles.COACH.value]
+    ),
+    "UserModel.find_all_coaches": lambda: UserModel.find_all_coaches(),
+    "BlacklistTokenModel.is_jti_blacklisted": lambda: BlacklistTokenModel.objects(
+        token=""
+    ),
+    "BlacklistTokenModel.find_blacklisted_since": lambda: (
+        BlacklistTokenModel.find_blacklisted_since(datetime.datetime.utcnow())
+    ),
+    "WorkshopModel.find_by_coach_id": lambda: WorkshopModel.find_by_coach_id(""),
+    "WorkshopModel.has_participant": lambda: WorkshopModel.objects(
+        workshopId="", participants__user=""
+    ),
+    "WorkshopModel.find_filtered": lambda: (
+        WorkshopModel.find_filtered(
+            coach_id="", start_from=datetime.datetime.utcnow()
+        ).order_by("startAt", "workshopId")
+    ),
+    "ActionCardModel.find_all": lambda: ActionCardModel.find_all(),
+    "ActionCardBatchModel.find_default_batches": lambda: (
+        ActionCardBatchModel.find_default_batches()
+    ),
+    "ActionCardBatchModel.find_action_card_batches_by_coach": lambda: (
+        ActionCardBatchModel.find_action_card_batches_by_coach("")
+    ),
+    "Model.find_last_created_model": lambda: Model.objects.order_by("-createdAt"),
+    "CarbonFormAnswersModel.find_all_by_workshop_id": lambda: (
+        CarbonFormAnswersModel.find_all_by_workshop_id("")
+    ),
+}
+
 
 @click.command("create_admin")
 @click.option("--firstname", default="admin", prompt="User first name")
@@ -98,6 +153,9 @@ def importcsv(collection, csv_file, drop):
             data = model(**_parse_row(row, model))
             data.save()
             count += 1
+    if model is ActionCardModel:
+        # Let every worker reload its action cards catalog
+        CatalogVersionModel.bump(CATALOG_NAME)
     click.echo(
         click.style(
             "Successfully inserted {} objects in collection {}".format(
@@ -171,4 +229,236 @@ def importjson(collection, json_file, drop):
     return
 
 
-cli_commands = [create_admin, importcsv, importjson]
+@click.command("backfill_blacklist_expiry")
+@click.option(
+    "--batch-size", default=1000, help="Number of tokens updated per bulk write"
+)
+@with_appcontext
+def backfill_blacklist_expiry(batch_size):
+    """ Set the expiry of the blacklisted tokens stored without one
+
+    A token is blacklisted while it is still valid, so its expiry is at most
+    blacklistedOn + JWT_ACCESS_TOKEN_EXPIRES. Once set, the TTL index
+    removes the token from the collection.
+    """
+    access_expires = current_app.config["JWT_ACCESS_TOKEN_EXPIRES"]
+    collection = BlacklistTokenModel._get_collection()
+
+    count = 0
+    operations = []
+    for blacklisted_token in BlacklistTokenModel.find_without_expiry():
+        operations.append(
+            UpdateOne(
+                {"_id": blacklisted_token.pk},
+                {
+                    "$set": {
+                        "expiresAt": blacklisted_token.blacklistedOn + access_expires
+                    }
+                },
+            )
+        )
+        if len(operations) >= batch_size:
+            count += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        count += collection.bulk_write(operations, ordered=False).modified_count
+
+    click.echo(
+        click.style(
+            "Successfully set the expiry of {} tokens".format(count), fg="green"
+        )
+    )
+    return
+
+
+@click.command("recompute-coach-stats")
+@click.option(
+    "--batch-size", default=1000, help="Number of coaches updated per bulk write"
+)
+@with_appcontext
+def recompute_coach_stats(batch_size):
+    """ Rebuild the workshopsCount and awarenessRaisedCount of the coaches
+
+    The services keep them up to date incrementally, this command fixes
+    any drift from the workshops and carbonFormAnswers collections.
+    """
+    workshops_pipeline = [{"$group": {"_id": "$coachId", "count": {"$sum": 1}}}]
+    # Participants are made aware once they submit their carbon form
+    awareness_pipeline = [
+        {
+            "$lookup": {
+                "from": WorkshopModel._get_collection_name(),
+                "localField": "workshopId",
+                "foreignField": "_id",
+                "as": "workshop",
+            }
+        },
+        {"$unwind": "$workshop"},
+        {"$group": {"_id": "$workshop.coachId", "count": {"$sum": 1}}},
+    ]
+    workshops_counts = {
+        s["_id"]: s["count"]
+        for s in WorkshopModel.objects.aggregate(
+            workshops_pipeline, batchSize=batch_size
+        )
+    }
+    awareness_counts = {
+        s["_id"]: s["count"]
+        for s in CarbonFormAnswersModel.objects.aggregate(
+            awareness_pipeline, batchSize=batch_size
+        )
+    }
+    collection = UserModel._get_collection()
+
+    count = 0
+    operations = []
+    for coach in UserModel.find_all_coaches(only=("userId",)):
+        operations.append(
+            UpdateOne(
+                {"_id": coach.pk},
+                {
+                    "$set": {
+                        "workshopsCount": workshops_counts.get(coach.pk, 0),
+                        "awarenessRaisedCount": awareness_counts.get(coach.pk, 0),
+                    }
+                },
+            )
+        )
+        if len(operations) >= batch_size:
+            count += collection.bulk_write(operations, ordered=False).modified_count
+            operations = []
+    if operations:
+        count += collection.bulk_write(operations, ordered=False).modified_count
+
+    click.echo(
+        click.style(
+            "Successfully updated the statistics of {} coaches".format(count),
+            fg="green",
+        )
+    )
+    return
+
+
+@click.command("backfill-participant-snapshots")
+@click.option(
+    "--batch-size", default=1000, help="Number of participants updated per bulk write"
+)
+@with_appcontext
+def backfill_participant_snapshots(batch_size):
+    """ Store the snapshot of the participants added before it existed
+
+    The workshop services only fill the missing snapshots when dumping a
+    workshop, without writing them back. Once stored, the participant users
+    don't need to be loaded anymore.
+    """
+    collection = WorkshopModel._get_collection()
+
+    count = 0
+    operations = []
+    for workshop in WorkshopModel.find_without_participant_snapshots():
+        missing = [wp for wp in workshop.participants if wp.email is None]
+        workshop.fill_participant_snapshots()
+        for workshop_participant in missing:
+            # Users deleted meanwhile are left without a snapshot
+            if workshop_participant.email is None:
+                continue
+            operations.append(
+                UpdateOne(
+                    {
+                        "_id": workshop.pk,
+                        "participants.userId": workshop_participant.user.id,
+                    },
+                    {
+                        "$set": {
+                            "participants.$.{}".format(field): getattr(
+                                workshop_participant, field
+                            )
+                            for field in PARTICIPANT_SNAPSHOT_FIELDS
+                        }
+                    },
+                )
+            )
+            if len(operations) >= batch_size:
+                count += collection.bulk_write(operations, ordered=False).modified_count
+                operations = []
+    if operations:
+        count += collection.bulk_write(operations, ordered=False).modified_count
+
+    click.echo(
+        click.style(
+            "Successfully stored the snapshot of {} participants".format(count),
+            fg="green",
+        )
+    )
+    return
+
+
+def _get_plan_stages(plan: dict) -> list:
+    stages = [plan["stage"]]
+    if "inputStage" in plan:
+        stages += _get_plan_stages(plan["inputStage"])
+    for input_stage in plan.get("inputStages", []):
+        stages += _get_plan_stages(input_stage)
+    return stages
+
+
+@click.command("ensure-indexes")
+@click.option(
+    "--explain/--no-explain",
+    default=True,
+    help="Whether to report the query plans of the services queries or not",
+)
+@with_appcontext
+def ensure_indexes(explain):
+    """ Build the indexes declared in the models meta
+
+    Indexes are built in the background. The models don't build them on
+    their first use (auto_create_index), so that no worker builds them in
+    the foreground after a deployment. Once done, the queries run by the
+    services are explained and the ones still scanning a whole collection
+    (COLLSCAN) are reported.
+    """
+    for model in INDEXED_MODELS:
+        collection = model._get_collection()
+        for index_spec in model._meta["index_specs"]:
+            index_spec = index_spec.copy()
+            fields = index_spec.pop("fields")
+            collection.create_index(fields, background=True, **index_spec)
+        click.echo(
+            "Indexes of collection {} ensured : {}".format(
+                collection.name, ", ".join(collection.index_information().keys())
+            )
+        )
+
+    if not explain:
+        return
+
+    collscan_count = 0
+    for name, get_queryset in EXPLAINED_QUERIES.items():
+        try:
+            plan = get_queryset().explain()["queryPlanner"]["winningPlan"]
+        except (AttributeError, NotImplementedError, OperationFailure):
+            click.echo(click.style("{} : explain not supported".format(name), fg="red"))
+            continue
+        stages = _get_plan_stages(plan)
+        if "COLLSCAN" in stages:
+            collscan_count += 1
+            click.echo(click.style("{} : COLLSCAN".format(name), fg="red"))
+        else:
+            click.echo(
+                click.style("{} : {}".format(name, " > ".join(stages)), fg="green")
+            )
+
+    click.echo("{} queries still scan a whole collection".format(collscan_count))
+    return
+
+
+cli_commands = [
+    create_admin,
+    importcsv,
+    importjson,
+    backfill_blacklist_expiry,
+    backfill_participant_snapshots,
+    ensure_indexes,
+    recompute_coach_stats,
+]
@@ -1,17 +1,35 @@
 from functools import wraps
 
-from flask_jwt_extended import get_current_user
+from flask import current_app
+from flask_jwt_extended import get_current_user, get_jwt_claims
 
 from app.common.errors import PermissionDeniedError
-from app.models.user_model import Roles
+from app.models.user_model import ACCESS_LEVEL, Roles
+
+# User claim holding the user access level when JWT_STATELESS_AUTHORIZATION is on
+ACCESS_LEVEL_CLAIM = "accessLevel"
+
+
+def has_access_level_claim() -> bool:
+    return (
+        current_app.config["JWT_STATELESS_AUTHORIZATION"]
+        and ACCESS_LEVEL_CLAIM in get_jwt_claims()
+    )
 
 
 def requires_access_level(access_level: Roles):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            user = get_current_user()
-            if user is None or not user.allowed(access_level):
+            if has_access_level_claim():
+                allowed = (
+                    get_jwt_claims()[ACCESS_LEVEL_CLAIM]
+                    >= ACCESS_LEVEL[access_level.value]
+                )
+            else:
+                user = get_current_user()
+                allowed = user is not None and user.allowed(access_level)
+            if not allowed:
                 raise PermissionDeniedError
             return f(*args, **kwargs)
 
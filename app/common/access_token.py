@@ -0,0 +1,66 @@
+import time
+from functools import wraps
+
+from flask import _app_ctx_stack as ctx_stack
+from flask import request
+from flask_jwt_extended import get_raw_jwt, get_raw_jwt_header, verify_jwt_in_request
+from flask_jwt_extended.config import config
+from flask_jwt_extended.utils import verify_token_claims, verify_token_not_blacklisted
+from flask_jwt_extended.view_decorators import _load_user
+
+from app.common.cache import decoded_token_cache
+
+
+def _get_encoded_token_from_headers() -> str:
+    parts = request.headers.get(config.header_name, "").split()
+    if len(parts) == 2 and parts[0] == config.header_type:
+        return parts[1]
+    return None
+
+
+def verify_access_token_in_request() -> None:
+    """
+    Same as flask_jwt_extended.verify_jwt_in_request, except that tokens whose
+    signature has already been verified by this worker are taken from
+    decoded_token_cache instead of being decoded again.
+    Revoked token and claims checks, as well as the user loading, still run
+    on every request.
+    """
+    if request.method in config.exempt_methods:
+        return
+
+    encoded_token = _get_encoded_token_from_headers()
+    cached = decoded_token_cache.get(encoded_token) if encoded_token else None
+
+    if cached is None:
+        verify_jwt_in_request()
+        if encoded_token is not None:
+            jwt_data = get_raw_jwt()
+            # Never keep a token longer than its own expiry
+            ttl = jwt_data["exp"] - time.time()
+            if ttl > 0:
+                decoded_token_cache.set(
+                    encoded_token, (jwt_data, get_raw_jwt_header()), ttl=ttl
+                )
+        return
+
+    jwt_data, jwt_header = cached
+    verify_token_not_blacklisted(jwt_data, request_type="access")
+    ctx_stack.top.jwt = jwt_data
+    ctx_stack.top.jwt_header = jwt_header
+    verify_token_claims(jwt_data)
+    _load_user(jwt_data[config.identity_claim_key])
+
+
+def jwt_required(fn):
+    """
+    Drop-in replacement of flask_jwt_extended.jwt_required using the decoded
+    token cache
+    """
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        verify_access_token_in_request()
+        return fn(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,42 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class BackgroundTasks:
+    """
+    Runs tasks out of the request, in a small pool of threads, within an
+    application context. Tasks are lost if the process stops before they
+    are done : they have to be safe to run again (or to fix with a command).
+    When `BACKGROUND_TASKS_EAGER` is set, tasks are run right away instead
+    (ex: for the tests).
+    """
+
+    def __init__(self):
+        self.eager = False
+        self._app = None
+        self._executor = None
+
+    def init_app(self, app) -> None:
+        self._app = app
+        self.eager = app.config["BACKGROUND_TASKS_EAGER"]
+        self._executor = ThreadPoolExecutor(
+            max_workers=app.config["BACKGROUND_TASKS_MAX_WORKERS"],
+            thread_name_prefix="background-tasks",
+        )
+
+    def _run(self, func, *args, **kwargs):
+        with self._app.app_context():
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                self._app.logger.exception("Background task %s failed", func.__name__)
+                raise
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        if self.eager:
+            future = Future()
+            future.set_result(func(*args, **kwargs))
+            return future
+        return self._executor.submit(self._run, func, *args, **kwargs)
+
+
+background_tasks = BackgroundTasks()
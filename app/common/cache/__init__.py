@@ -0,0 +1,10 @@
+from app.common.cache.action_card_catalog import ActionCardCatalog
+from app.common.cache.lru_cache import LRUCache
+from app.common.cache.revoked_token_cache import RevokedTokenCache
+from app.common.cache.user_cache import UserCache
+
+revoked_token_cache = RevokedTokenCache()
+user_cache = UserCache()
+decoded_token_cache = LRUCache()
+count_cache = LRUCache(max_size=128)
+action_card_catalog = ActionCardCatalog()
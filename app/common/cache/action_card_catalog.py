@@ -0,0 +1,90 @@
+import hashlib
+import threading
+import time
+from collections import namedtuple
+
+from flask import jsonify
+
+from app.models.action_card_model import ActionCardModel
+from app.models.catalog_version_model import CatalogVersionModel
+from app.schemas.raw_dumps import dump_raw_action_cards
+
+CATALOG_NAME = "actionCards"
+
+_Catalog = namedtuple(
+    "_Catalog", ["cards", "cards_by_id", "types_by_id", "payload", "etag"]
+)
+
+
+class ActionCardCatalog:
+    """
+    Per worker copy of the action cards, which only change on imports.
+
+    The cards are kept already dumped (as ActionCardSchema does), along with
+    an id to card and an id to type maps, and their JSON encoding with its hash
+    to serve them as is. At most every `revalidate_interval`
+    seconds, the version stamp of the catalog is read from Mongo and the cards
+    are reloaded if it was bumped (see CatalogVersionModel).
+    The cached objects are shared between requests : read them, don't modify them.
+    """
+
+    def __init__(self):
+        self.revalidate_interval = 5.0
+        self._lock = threading.Lock()
+        # Swapped at once on reload
+        self._catalog = _Catalog([], {}, {}, None, None)
+        self.invalidate()
+
+    def init_app(self, app) -> None:
+        self.revalidate_interval = app.config[
+            "ACTION_CARD_CATALOG_REVALIDATE_INTERVAL"
+        ].total_seconds()
+        self.invalidate()
+
+    def invalidate(self) -> None:
+        """Reload the cards of this worker on the next access"""
+        self._version = None
+        self._next_revalidation = 0.0
+
+    def _revalidate(self) -> None:
+        if time.monotonic() < self._next_revalidation:
+            return
+
+        with self._lock:
+            # Another thread may have revalidated while we were waiting
+            if time.monotonic() < self._next_revalidation:
+                return
+
+            version = CatalogVersionModel.get_version(CATALOG_NAME)
+            if version != self._version:
+                cards = dump_raw_action_cards(ActionCardModel.find_all().as_pymongo())
+                payload = jsonify(cards).get_data()
+                self._catalog = _Catalog(
+                    cards=cards,
+                    cards_by_id={card["id"]: card for card in cards},
+                    types_by_id={card["id"]: card["type"] for card in cards},
+                    payload=payload,
+                    etag=hashlib.sha256(payload).hexdigest(),
+                )
+                self._version = version
+            self._next_revalidation = time.monotonic() + self.revalidate_interval
+
+    def get_cards(self) -> list:
+        self._revalidate()
+        return self._catalog.cards
+
+    def get_cards_by_id(self) -> dict:
+        self._revalidate()
+        return self._catalog.cards_by_id
+
+    def get_types_by_id(self) -> dict:
+        self._revalidate()
+        return self._catalog.types_by_id
+
+    def get_payload(self) -> (bytes, str):
+        """
+        :return: The cards encoded in JSON, and the hash of the encoding
+        """
+        self._revalidate()
+        catalog = self._catalog
+        return catalog.payload, catalog.etag
@@ -0,0 +1,101 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from app.common.cache.bloom_filter import BloomFilter
+from app.common.cache.lru_cache import LRUCache
+from app.models.user_model import BlacklistTokenModel
+
+# Overlap applied to the refresh watermark so that tokens blacklisted by another
+# worker with a slightly late clock (or a slow insert) are not missed
+WATERMARK_OVERLAP = timedelta(seconds=5)
+
+
+class RevokedTokenCache:
+    """
+    Per worker cache of the blacklisted token ids.
+
+    A bloom filter holding every token blacklisted during the last
+    `retention` period answers most lookups ("not revoked") without touching
+    Mongo. It is refreshed incrementally from `blacklistedOn`, at most every
+    `refresh_interval` seconds, which bounds the delay before a token revoked
+    from another worker is refused. Positive answers of the filter are
+    confirmed against Mongo once, then kept in a small TTL'd LRU.
+    """
+
+    def __init__(self):
+        self.refresh_interval = 30.0
+        self.retention = timedelta(days=2)
+        self.capacity = 100000
+        self.error_rate = 0.01
+        self._positives = LRUCache(max_size=1024, ttl=600)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def init_app(self, app) -> None:
+        config = app.config
+        self.refresh_interval = config[
+            "REVOKED_TOKEN_CACHE_REFRESH_INTERVAL"
+        ].total_seconds()
+        self.retention = config["JWT_ACCESS_TOKEN_EXPIRES"]
+        self.capacity = config["REVOKED_TOKEN_CACHE_CAPACITY"]
+        self.error_rate = config["REVOKED_TOKEN_CACHE_ERROR_RATE"]
+        self._positives.configure(
+            max_size=config["REVOKED_TOKEN_CACHE_POSITIVE_SIZE"],
+            ttl=config["REVOKED_TOKEN_CACHE_POSITIVE_TTL"].total_seconds(),
+        )
+        self._reset()
+
+    def _reset(self) -> None:
+        self._bloom_filter = BloomFilter(self.capacity, self.error_rate)
+        self._watermark = None
+        self._next_refresh = 0.0
+
+    def refresh(self, force: bool = False) -> None:
+        if not force and time.monotonic() < self._next_refresh:
+            return
+
+        with self._lock:
+            # Another thread may have refreshed while we were waiting
+            if not force and time.monotonic() < self._next_refresh:
+                return
+
+            # Rebuild from scratch once the filter is full to keep its error rate
+            if self._bloom_filter.count >= self.capacity:
+                self._reset()
+
+            if self._watermark is None:
+                since = datetime.utcnow() - self.retention
+            else:
+                since = self._watermark - WATERMARK_OVERLAP
+
+            watermark = self._watermark
+            for blacklisted_token in BlacklistTokenModel.find_blacklisted_since(since):
+                self._bloom_filter.add(blacklisted_token.token)
+                if watermark is None or blacklisted_token.blacklistedOn > watermark:
+                    watermark = blacklisted_token.blacklistedOn
+
+            self._watermark = watermark or since
+            self._next_refresh = time.monotonic() + self.refresh_interval
+
+    def add(self, jti: str) -> None:
+        """
+        To call once a token has been blacklisted in DB by the current worker
+        """
+        self._bloom_filter.add(jti)
+        self._positives.set(jti, True)
+
+    def is_revoked(self, jti: str) -> bool:
+        self.refresh()
+
+        if jti not in self._bloom_filter:
+            return False
+
+        if self._positives.get(jti):
+            return True
+
+        # Either revoked or a false positive of the filter
+        revoked = BlacklistTokenModel.is_jti_blacklisted(jti)
+        if revoked:
+            self._positives.set(jti, True)
+        return revoked
@@ -0,0 +1,66 @@
+import threading
+import time
+
+from app.common.cache.lru_cache import LRUCache
+from app.models.catalog_version_model import CatalogVersionModel
+
+CATALOG_NAME = "users"
+
+
+class UserCache(LRUCache):
+    """
+    Per worker cache of the users loaded from the access token identity.
+
+    A user saved or updated by this worker is dropped right away (see
+    setup_cache). When the tokens of a user are revoked, the version stamp
+    of the users is bumped too (see CatalogVersionModel), and every worker
+    drops all its cached users once it sees the new version. It is read at
+    most every `revalidate_interval` seconds : that is how long another
+    worker may still accept a revoked token.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.revalidate_interval = 5.0
+        self._revalidation_lock = threading.Lock()
+        self._version = None
+        self._next_revalidation = 0.0
+
+    def init_app(self, app) -> None:
+        self.configure(
+            max_size=app.config["USER_CACHE_SIZE"],
+            ttl=app.config["USER_CACHE_TTL"].total_seconds(),
+        )
+        self.revalidate_interval = app.config[
+            "USER_CACHE_REVALIDATE_INTERVAL"
+        ].total_seconds()
+        self._version = None
+        self._next_revalidation = 0.0
+
+    def _revalidate(self) -> None:
+        if time.monotonic() < self._next_revalidation:
+            return
+
+        with self._revalidation_lock:
+            # Another thread may have revalidated while we were waiting
+            if time.monotonic() < self._next_revalidation:
+                return
+
+            version = CatalogVersionModel.get_version(CATALOG_NAME)
+            if version != self._version:
+                self.clear()
+                self._version = version
+            self._next_revalidation = time.monotonic() + self.revalidate_interval
+
+    def get(self, key, default=None):
+        self._revalidate()
+        return super().get(key, default)
+
+    def set(self, key, value, ttl: float = None) -> None:
+        self._revalidate()
+        super().set(key, value, ttl)
+
+    def revoke_all(self) -> None:
+        """Drop the cached users of every worker, on their next revalidation"""
+        CatalogVersionModel.bump(CATALOG_NAME)
+        self.clear()
@@ -5,6 +5,8 @@ class ErrorType(Enum):
     AUTHORIZATION_ERROR = "Authorization Error"
     INVALID_DATA_ERROR = "Invalid Data Error"
     BAD_REQUEST_ERROR = "Bad Request Error"
+    SERVICE_UNAVAILABLE_ERROR = "Service Unavailable Error"
+    TOO_MANY_REQUESTS_ERROR = "Too Many Requests Error"
 
 
 class CustomException(Exception):
@@ -94,3 +96,17 @@ class EmptyBodyError(CustomException):
     error_type = ErrorType.INVALID_DATA_ERROR
     msg = "Body should not be empty."
     code = 400
+
+
+# Too Many Requests Errors
+class TooManyRequestsError(CustomException):
+    error_type = ErrorType.TOO_MANY_REQUESTS_ERROR
+    msg = "Too many attempts. Please try again later."
+    code = 429
+
+
+# Service Unavailable Errors
+class ServiceUnavailableError(CustomException):
+    error_type = ErrorType.SERVICE_UNAVAILABLE_ERROR
+    msg = "Server is busy. Please try again later."
+    code = 503
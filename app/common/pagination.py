@@ -0,0 +1,83 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from mongoengine import Q, QuerySet
+
+from app.common.errors import InvalidDataError
+
+# Explicit format, isoformat drops the microseconds when they are 0
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.strftime(DATE_FORMAT)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.strptime(value["$date"], DATE_FORMAT)
+    return value
+
+
+def encode_cursor(values: list) -> str:
+    data = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, length: int) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        values = [_decode_value(v) for v in values]
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise InvalidDataError(msg="Invalid cursor.")
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidDataError(msg="Invalid cursor.")
+    return values
+
+
+def _after(order_by: tuple, values: list) -> Q:
+    # (f1, f2, ...) > (v1, v2, ...)
+    # <=> f1 > v1 or (f1 == v1 and (f2, ...) > (v2, ...))
+    field, value = order_by[0], values[0]
+    query = Q(**{"{}__gt".format(field): value})
+    if len(order_by) > 1:
+        query = query | (Q(**{field: value}) & _after(order_by[1:], values[1:]))
+    return query
+
+
+def _get_values(queryset: QuerySet, item, order_by: tuple) -> list:
+    if isinstance(item, dict):
+        # Raw document of an as_pymongo() queryset
+        fields = queryset._document._fields
+        return [item[fields[f].db_field] for f in order_by]
+    return [getattr(item, f) for f in order_by]
+
+
+def paginate(
+    queryset: QuerySet, order_by: tuple, limit: int, cursor: str = None
+) -> (list, str):
+    """
+    Keyset pagination of a queryset.
+    :param order_by: Ascending sort fields. The last one has to be unique
+    (usually the primary key) and all of them loaded by the queryset.
+    The queryset can be an as_pymongo() one.
+    :param cursor: Opaque cursor returned with the previous page
+    :return: Items of the page, cursor of the next page (None on the last one)
+    """
+    if cursor is not None:
+        queryset = queryset.filter(
+            _after(order_by, decode_cursor(cursor, len(order_by)))
+        )
+
+    # Fetch one more item to know if there is a next page
+    items = list(queryset.order_by(*order_by).limit(limit + 1))
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(_get_values(queryset, items[-1], order_by))
+
+    return items, next_cursor
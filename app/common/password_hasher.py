@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.common.errors import ServiceUnavailableError
+
+
+class PasswordHasher:
+    """
+    Runs the (deliberately slow) password hashing functions in a bounded pool
+    of threads so that a burst of logins can't hold every web worker.
+    Once `max_workers + max_queue` hashes are pending, new ones are rejected
+    right away with a ServiceUnavailableError.
+    """
+
+    def __init__(self):
+        self.method = "pbkdf2:sha256:150000"
+        self.timeout = None
+        self._executor = None
+        self._slots = None
+
+    def init_app(self, app) -> None:
+        max_workers = app.config["PASSWORD_HASH_MAX_WORKERS"]
+        # Spelled as stored in the hashes (ex: pbkdf2:sha256 is stored with its
+        # default number of iterations), for needs_rehash
+        method = app.config["PASSWORD_HASH_METHOD"]
+        self.method = generate_password_hash("", method=method).split("$", 1)[0]
+        self.timeout = app.config["PASSWORD_HASH_TIMEOUT"].total_seconds()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hasher"
+        )
+        self._slots = threading.BoundedSemaphore(
+            max_workers + app.config["PASSWORD_HASH_MAX_QUEUE"]
+        )
+
+    def _run(self, func, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            raise ServiceUnavailableError
+
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise ServiceUnavailableError
+
+    def generate(self, password: str) -> str:
+        return self._run(generate_password_hash, password, method=self.method)
+
+    def check(self, pwhash: str, password: str) -> bool:
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash: str) -> bool:
+        # Hashes are stored as method$salt$hash
+        return pwhash.split("$", 1)[0] != self.method
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,132 @@
+import math
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, request
+
+from app.common.errors import TooManyRequestsError
+from app.models.rate_limit_model import RateLimitCounterModel
+
+
+class MemoryRateLimitBackend:
+    """
+    Sliding window log kept in the memory of the worker.
+    Shared between the threads of a worker only.
+    """
+
+    # Number of hits between two purges of the inactive keys
+    PURGE_EVERY = 1000
+
+    def __init__(self):
+        self._hits = {}
+        self._lock = threading.Lock()
+        self._hits_since_purge = 0
+
+    def hit(self, key: str, limit: int, window: float) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._hits_since_purge += 1
+            if self._hits_since_purge >= self.PURGE_EVERY:
+                self._purge(now - window)
+
+            hits = self._hits.setdefault(key, deque())
+            while hits and hits[0] <= now - window:
+                hits.popleft()
+            if len(hits) >= limit:
+                return False
+            hits.append(now)
+            return True
+
+    def _purge(self, window_start: float) -> None:
+        self._hits = {
+            key: hits
+            for key, hits in self._hits.items()
+            if hits and hits[-1] > window_start
+        }
+        self._hits_since_purge = 0
+
+
+class MongoRateLimitBackend:
+    """
+    Sliding window counter stored in Mongo, shared between all the workers.
+    The number of hits during the last `window` seconds is estimated from the
+    counters of the current and previous fixed windows.
+    """
+
+    def hit(self, key: str, limit: int, window: float) -> bool:
+        now = time.time()
+        window_number = math.floor(now / window)
+        elapsed = (now - window_number * window) / window
+
+        current = RateLimitCounterModel.objects(
+            rateLimitCounterId="{}:{}".format(key, window_number)
+        ).modify(
+            upsert=True,
+            new=True,
+            inc__count=1,
+            set_on_insert__expiresAt=datetime.utcnow() + timedelta(seconds=2 * window),
+        )
+        previous = (
+            RateLimitCounterModel.objects(
+                rateLimitCounterId="{}:{}".format(key, window_number - 1)
+            )
+            .only("count")
+            .first()
+        )
+        previous_count = previous.count if previous is not None else 0
+
+        return previous_count * (1 - elapsed) + current.count <= limit
+
+
+RATE_LIMIT_BACKENDS = {"memory": MemoryRateLimitBackend, "mongo": MongoRateLimitBackend}
+
+
+class RateLimiter:
+    def __init__(self):
+        self.backend = MemoryRateLimitBackend()
+
+    def init_app(self, app) -> None:
+        self.backend = RATE_LIMIT_BACKENDS[app.config["RATE_LIMIT_BACKEND"]]()
+
+    def hit(self, key: str, limit: int) -> bool:
+        window = current_app.config["RATE_LIMIT_WINDOW"].total_seconds()
+        return self.backend.hit(key, limit, window)
+
+
+rate_limiter = RateLimiter()
+
+
+def _get_request_email() -> str:
+    data = request.get_json(force=True, silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("email"), str):
+        return None
+    return data["email"].strip().lower()
+
+
+def rate_limited(scope: str):
+    """
+    Limit the number of requests per client address and per email (read from
+    the JSON body) during RATE_LIMIT_WINDOW, according to RATE_LIMITS[scope].
+    Requests over the limit are rejected before reaching the view.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if current_app.config["RATE_LIMIT_ENABLED"]:
+                limits = current_app.config["RATE_LIMITS"][scope]
+                keys = {"address": request.remote_addr, "email": _get_request_email()}
+                for key_type, value in keys.items():
+                    if value is None:
+                        continue
+                    key = "{}:{}:{}".format(scope, key_type, value)
+                    if not rate_limiter.hit(key, limits[key_type]):
+                        raise TooManyRequestsError
+            return f(*args, **kwargs)
+
+        return decorated_function
+
+    return decorator
@@ -14,6 +14,70 @@ class Config:
     JWT_BLACKLIST_ENABLED = True
     JWT_BLACKLIST_TOKEN_CHECKS = ["access"]
     JWT_ACCESS_TOKEN_EXPIRES = datetime.timedelta(days=2)
+    # Embed the access level in the access token so that permission checks
+    # don't load the user from DB
+    JWT_STATELESS_AUTHORIZATION = bool(int(os.getenv("JWT_STATELESS_AUTHORIZATION", 0)))
+
+    # Revoked token cache
+    # Max delay before a token revoked by another worker is refused
+    REVOKED_TOKEN_CACHE_REFRESH_INTERVAL = datetime.timedelta(
+        seconds=int(os.getenv("REVOKED_TOKEN_CACHE_REFRESH_INTERVAL", 30))
+    )
+    REVOKED_TOKEN_CACHE_CAPACITY = int(
+        os.getenv("REVOKED_TOKEN_CACHE_CAPACITY", 100000)
+    )
+    REVOKED_TOKEN_CACHE_ERROR_RATE = 0.01
+    REVOKED_TOKEN_CACHE_POSITIVE_SIZE = 1024
+    REVOKED_TOKEN_CACHE_POSITIVE_TTL = datetime.timedelta(minutes=10)
+
+    # Access tokens whose signature has already been verified
+    JWT_DECODE_CACHE_SIZE = int(os.getenv("JWT_DECODE_CACHE_SIZE", 4096))
+
+    # Users loaded from the access token identity
+    USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1024))
+    USER_CACHE_TTL = datetime.timedelta(seconds=int(os.getenv("USER_CACHE_TTL", 60)))
+    # Max delay before a worker sees the tokens revoked by another one
+    USER_CACHE_REVALIDATE_INTERVAL = datetime.timedelta(seconds=5)
+
+    # Max delay before a worker sees a new version of the action cards catalog
+    ACTION_CARD_CATALOG_REVALIDATE_INTERVAL = datetime.timedelta(seconds=5)
+
+    # Pagination of the list endpoints
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
+    # Max age of the total counts returned along with the pages
+    COUNT_CACHE_TTL = datetime.timedelta(minutes=1)
+
+    # Max number of participants registered by a single bulk request
+    PARTICIPANTS_BULK_MAX_SIZE = 500
+
+    # Deletion of the documents depending on a deleted coach or workshop
+    CASCADE_DELETE_BATCH_SIZE = 1000
+    # Cascades touching more documents are run in a background task
+    CASCADE_DELETE_DEFER_THRESHOLD = 200
+
+    # Background tasks
+    BACKGROUND_TASKS_MAX_WORKERS = 2
+    BACKGROUND_TASKS_EAGER = False
+
+    # Password hashing
+    # Hashes of a different method (or cost) are upgraded at login
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "pbkdf2:sha256:150000")
+    PASSWORD_HASH_MAX_WORKERS = int(os.getenv("PASSWORD_HASH_MAX_WORKERS", 4))
+    # Hashes waiting for a worker before rejecting with a 503
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 16))
+    PASSWORD_HASH_TIMEOUT = datetime.timedelta(seconds=10)
+
+    # Rate limiting of the unauthenticated endpoints
+    RATE_LIMIT_ENABLED = True
+    # "memory" (limits per worker) or "mongo" (limits shared between workers)
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_WINDOW = datetime.timedelta(minutes=1)
+    # Max number of requests per window, by email and by client address
+    RATE_LIMITS = {
+        "login": {"email": 10, "address": 60},
+        "forgotten_password": {"email": 3, "address": 10},
+    }
 
     # Flask Mail
     MAIL_SERVER = os.getenv("MAIL_SERVER")
@@ -47,6 +111,8 @@ class DevelopmentConfig(Config):
 class TestingConfig(Config):
     DEBUG = True
     TESTING = True
+    RATE_LIMIT_ENABLED = False
+    BACKGROUND_TASKS_EAGER = True
     MONGODB_SETTINGS = {"db": "test", "host": "mongomock://localhost"}
 
 
@@ -1,12 +1,71 @@
 from flask import jsonify, make_response
+from mongoengine import signals
 
+from app.common.cache import (
+    action_card_catalog,
+    count_cache,
+    decoded_token_cache,
+    revoked_token_cache,
+    user_cache,
+)
 from app.common.errors import (
     ExpiredTokenError,
     InvalidTokenError,
     RevokedTokenError,
     UnauthorizedTokenError,
 )
-from app.models.user_model import BlacklistTokenModel, UserModel
+from app.models.action_card_model import ActionCardModel
+from app.models.user_model import TOKEN_GENERATION_CLAIM, UserModel, users_updated
+
+
+def _find_user(user_id: str) -> UserModel:
+    # The cached document is shared between requests : read it, don't modify it
+    user = user_cache.get(user_id)
+    if user is None:
+        user = UserModel.find_by_id(user_id)
+        if user is not None:
+            user_cache.set(user_id, user)
+    return user
+
+
+def _invalidate_cached_user(sender, document, **kwargs):
+    user_cache.invalidate(document.pk)
+
+
+def _invalidate_cached_users(sender, user_ids, tokens_revoked=False, **kwargs):
+    if tokens_revoked:
+        # Other workers may have cached these users too
+        user_cache.revoke_all()
+        return
+    for user_id in user_ids:
+        user_cache.invalidate(user_id)
+
+
+def _invalidate_action_card_catalog(sender, document, **kwargs):
+    action_card_catalog.invalidate()
+
+
+def setup_cache(app):
+    revoked_token_cache.init_app(app)
+    user_cache.init_app(app)
+    decoded_token_cache.configure(max_size=app.config["JWT_DECODE_CACHE_SIZE"])
+    count_cache.configure(
+        max_size=count_cache.max_size,
+        ttl=app.config["COUNT_CACHE_TTL"].total_seconds(),
+    )
+
+    # Cached users are dropped as soon as they are saved, deleted or updated
+    # by one of the atomic updates of UserModel. The other workers wait for
+    # the bump of the users version when tokens are revoked.
+    signals.post_save.connect(_invalidate_cached_user, sender=UserModel)
+    signals.post_delete.connect(_invalidate_cached_user, sender=UserModel)
+    users_updated.connect(_invalidate_cached_users, sender=UserModel)
+
+    # The action cards of this worker are reloaded as soon as one of them is
+    # saved or deleted. The other workers wait for the bump of the catalog version.
+    action_card_catalog.init_app(app)
+    signals.post_save.connect(_invalidate_action_card_catalog, sender=ActionCardModel)
+    signals.post_delete.connect(_invalidate_action_card_catalog, sender=ActionCardModel)
 
 
 def setup_jwt(jwt):
@@ -14,7 +73,13 @@ def setup_jwt(jwt):
     @jwt.token_in_blacklist_loader
     def check_if_token_in_blacklist(decrypted_token: dict) -> bool:
         jti = decrypted_token["jti"]
-        return BlacklistTokenModel.is_jti_blacklisted(jti)
+        if revoked_token_cache.is_revoked(jti):
+            return True
+
+        # Tokens issued before the last UserModel.revoke_tokens are revoked too
+        user = _find_user(decrypted_token["identity"])
+        token_generation = decrypted_token["user_claims"].get(TOKEN_GENERATION_CLAIM, 0)
+        return user is None or token_generation != user.tokenGeneration
 
     @jwt.unauthorized_loader
     def unauthorized_callback(msg: str) -> (dict, int):
@@ -38,4 +103,6 @@ def setup_jwt(jwt):
 
     @jwt.user_loader_callback_loader
     def get_user_from_identity(user_id: str) -> UserModel:
-        return UserModel.find_by_id(user_id)
+        # Already cached by the revoked tokens check. A deleted user is
+        # rejected even when permissions are checked from the token.
+        return _find_user(user_id)
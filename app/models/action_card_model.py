@@ -17,7 +17,11 @@ class ActionCardCategory(Enum):
 
 
 class ActionCardModel(db.Document):
-    meta = {"collection": "actionCards"}
+    meta = {
+        "collection": "actionCards",
+        "auto_create_index": False,
+        "indexes": ["cardNumber"],
+    }
 
     actionCardId = db.StringField(primary_key=True, default=generate_id)
     cardNumber = db.IntField(required=True, min_value=0)
@@ -32,11 +36,15 @@ class ActionCardModel(db.Document):
 
     @classmethod
     def find_all(cls):
-        return cls.objects().order_by("number")
+        return cls.objects().order_by("cardNumber")
 
 
 class ActionCardBatchModel(db.Document):
-    meta = {"collection": "actionCardBatches"}
+    meta = {
+        "collection": "actionCardBatches",
+        "auto_create_index": False,
+        "indexes": [{"fields": ["coachId", "name"]}, {"fields": ["default", "name"]}],
+    }
 
     actionCardBatchId = db.StringField(primary_key=True, default=generate_id)
     coachId = db.StringField()
@@ -53,8 +61,29 @@ class ActionCardBatchModel(db.Document):
 
     @classmethod
     def find_default_batches(cls):
-        return cls.objects(default=True).all()
+        return cls.objects(default=True).order_by("name")
 
     @classmethod
     def find_action_card_batches_by_coach(cls, coach_id):
-        return cls.objects(coachId=coach_id).all()
+        return cls.objects(coachId=coach_id).order_by("name")
+
+    @classmethod
+    def find_effective_batches(cls, coach_id, custom_batches=False):
+        """
+        Coaches share the default batches until they set their own ones
+        (copy on write, see update_coach_action_card_batches).
+        Coaches who saved their batches before the customBatches flag existed
+        are recognized by having some
+        """
+        if (
+            not custom_batches
+            and cls.objects(coachId=coach_id).only("actionCardBatchId").first() is None
+        ):
+            return cls.find_default_batches()
+        return cls.find_action_card_batches_by_coach(coach_id)
+
+    @classmethod
+    def bulk_write(cls, operations: list) -> None:
+        # Raw operations : no validation, defaults nor signals
+        if operations:
+            cls._get_collection().bulk_write(operations, ordered=False)
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import datetime
+
+from app.models import db
+
+
+class CatalogVersionModel(db.Document):
+    """
+    Version stamp of a catalog cached by the workers (ex: the action cards).
+    Bump it whenever the catalog changes so that every worker reloads it.
+    """
+
+    meta = {"collection": "catalogVersions"}
+
+    catalogVersionId = db.StringField(primary_key=True)
+    version = db.IntField(default=0)
+    updatedAt = db.DateTimeField(default=datetime.datetime.utcnow)
+
+    @classmethod
+    def get_version(cls, catalog: str) -> int:
+        catalog_version = cls.objects(catalogVersionId=catalog).only("version").first()
+        return 0 if catalog_version is None else catalog_version.version
+
+    @classmethod
+    def bump(cls, catalog: str) -> None:
+        cls.objects(catalogVersionId=catalog).update_one(
+            upsert=True, inc__version=1, set__updatedAt=datetime.datetime.utcnow()
+        )
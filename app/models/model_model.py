@@ -9,7 +9,11 @@ from app.models import db
 
 
 class Model(db.Document):
-    meta = {"collection": "models"}
+    meta = {
+        "collection": "models",
+        "auto_create_index": False,
+        "indexes": ["-createdAt"],
+    }
 
     modelId = db.StringField(primary_key=True, default=generate_id)
     footprintStructure = db.DictField(required=True)
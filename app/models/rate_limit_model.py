@@ -0,0 +1,19 @@
+from app.models import db
+
+
+class RateLimitCounterModel(db.Document):
+    """
+    Number of hits of a rate limited key during a fixed window.
+    Used by the shared rate limit backend, see app.common.rate_limiter
+    """
+
+    meta = {
+        "collection": "rateLimitCounters",
+        "auto_create_index": False,
+        "indexes": [{"fields": ["expiresAt"], "expireAfterSeconds": 0}],
+    }
+
+    # <key>:<window number>
+    rateLimitCounterId = db.StringField(primary_key=True)
+    count = db.IntField(default=0)
+    expiresAt = db.DateTimeField(required=True)
@@ -3,9 +3,11 @@ from __future__ import annotations
 import datetime
 from enum import Enum
 
+from blinker import Namespace
 from flask import current_app
 from flask_jwt_extended import create_access_token
 from mongoengine import QuerySet
+from pymongo.errors import BulkWriteError
 
 from app.common.mail.mail_services import send_reset_password_mail
 from app.common.uuid_generator import generate_id
@@ -19,6 +21,14 @@ class Roles(Enum):
     ADMIN = "admin"
 
 
+# User claim holding the generation of the token, see UserModel.revoke_tokens
+TOKEN_GENERATION_CLAIM = "tokenGeneration"
+
+# Sent with the ids of the users changed by an atomic update (which doesn't
+# send the post_save signal), ex: to invalidate the cached users.
+# `tokens_revoked` is set when their tokens were revoked
+users_updated = Namespace().signal("users_updated")
+
 ACCESS_LEVEL = {
     Roles.GUEST.value: 0,
     Roles.PARTICIPANT.value: 1,  # Not used yet
@@ -28,9 +38,19 @@ ACCESS_LEVEL = {
 
 
 class BlacklistTokenModel(db.Document):
-    meta = {"collection": "blacklistedTokens"}
-    token = db.StringField(required=True)
+    meta = {
+        "collection": "blacklistedTokens",
+        # Indexes are only built by flask ensure-indexes, in the background
+        "auto_create_index": False,
+        "indexes": [
+            "blacklistedOn",
+            # Let Mongo remove the tokens once they are expired anyway
+            {"fields": ["expiresAt"], "expireAfterSeconds": 0},
+        ],
+    }
+    token = db.StringField(required=True, unique=True)
     blacklistedOn = db.DateTimeField(default=datetime.datetime.utcnow)
+    expiresAt = db.DateTimeField()
 
     @classmethod
     def is_jti_blacklisted(cls, jti: str) -> bool:
@@ -40,10 +60,23 @@ class BlacklistTokenModel(db.Document):
             query = None
         return query is not None
 
+    @classmethod
+    def find_blacklisted_since(cls, since: datetime.datetime) -> QuerySet:
+        return cls.objects(blacklistedOn__gte=since).only("token", "blacklistedOn")
+
+    @classmethod
+    def find_without_expiry(cls) -> QuerySet:
+        return cls.objects(expiresAt=None).only("blacklistedOn")
+
 
 class UserModel(db.Document):
 
-    meta = {"collection": "users"}
+    meta = {
+        "collection": "users",
+        "auto_create_index": False,
+        # Coaches are listed by creation date, see find_all_coaches
+        "indexes": [{"fields": ["role", "createdAt", "userId"]}],
+    }
 
     # User specific fields
     userId = db.StringField(primary_key=True, default=generate_id)
@@ -54,11 +87,17 @@ class UserModel(db.Document):
     role = db.ListField(db.StringField(max_length=32), required=True)
     createdAt = db.DateTimeField(default=datetime.datetime.utcnow)
     updatedAt = db.DateTimeField(default=datetime.datetime.utcnow)
+    # Tokens issued with a lower generation are revoked
+    tokenGeneration = db.IntField(default=0)
 
     # Coach specific fields
     city = db.StringField(max_length=256)
     workshopsCount = db.IntField()
+    # Carbon forms submitted by the participants of the coach's workshops
     awarenessRaisedCount = db.IntField()
+    # Set once the coach saved their own action card batches, even an empty
+    # list : the default ones are not used anymore
+    customBatches = db.BooleanField()
 
     # Participant specific fields
     workshopParticipations = db.ListField(db.StringField(), default=[])
@@ -69,15 +108,17 @@ class UserModel(db.Document):
     def __repr__(self):
         return f"<User {self.userId} - {self.firstName} {self.lastName}>"
 
+    def get_access_level(self) -> int:
+        return max([ACCESS_LEVEL[r] for r in self.role])
+
     def allowed(self, access_level: Roles) -> bool:
-        return (
-            max([ACCESS_LEVEL[r] for r in self.role])
-            >= ACCESS_LEVEL[access_level.value]
-        )
+        return self.get_access_level() >= ACCESS_LEVEL[access_level.value]
 
     def send_reset_password_mail(self) -> str:
         # Genereate temporary access token for password resetting
-        token = create_access_token(identity=self.id)
+        token = create_access_token(
+            identity=self.id, user_claims={TOKEN_GENERATION_CLAIM: self.tokenGeneration}
+        )
         reset_url = "{url}/reset_password?access_token={token}".format(
             url=current_app.config["PREFERRED_URL_SCHEME"], token=token
         )
@@ -85,14 +126,52 @@ class UserModel(db.Document):
         send_reset_password_mail(self.email, reset_url=reset_url)
         return token
 
+    def revoke_tokens(self) -> None:
+        """
+        Revoke every token issued to the user so far, whatever their number.
+        :return:
+        """
+        self.update(inc__tokenGeneration=1)
+        self.tokenGeneration += 1
+        users_updated.send(self.__class__, user_ids=[self.pk], tokens_revoked=True)
+
+        return
+
     @classmethod
-    def find_by_id(cls, user_id: str) -> UserModel:
+    def find_by_id(cls, user_id: str, only: tuple = None) -> UserModel:
+        queryset = cls.objects.only(*only) if only else cls.objects
         try:
-            user = cls.objects.get(userId=user_id)
+            user = queryset.get(userId=user_id)
         except db.DoesNotExist:
             user = None
         return user
 
+    @classmethod
+    def find_by_ids(cls, user_ids: list, only: tuple = None) -> QuerySet:
+        queryset = cls.objects(userId__in=user_ids)
+        return queryset.only(*only) if only else queryset
+
+    @classmethod
+    def insert_all(cls, users: list) -> set:
+        """
+        Insert new users with a single unordered insert_many : the ones which
+        fail (ex: an email registered meanwhile) do not prevent the others.
+        Raw insert, without validation nor signals
+        :return: The ids of the inserted users
+        """
+        try:
+            cls._get_collection().insert_many(
+                [user.to_mongo() for user in users], ordered=False
+            )
+        except BulkWriteError as e:
+            failed = {error["index"] for error in e.details["writeErrors"]}
+            return {user.pk for i, user in enumerate(users) if i not in failed}
+        return {user.pk for user in users}
+
+    @classmethod
+    def find_by_emails(cls, emails: list) -> QuerySet:
+        return cls.objects(email__in=emails)
+
     @classmethod
     def find_by_email(cls, email: str) -> UserModel:
         try:
@@ -102,9 +181,10 @@ class UserModel(db.Document):
         return user
 
     @classmethod
-    def find_coach_by_id(cls, user_id: str) -> UserModel:
+    def find_coach_by_id(cls, user_id: str, only: tuple = None) -> UserModel:
+        queryset = cls.objects.only(*only) if only else cls.objects
         try:
-            user = cls.objects.get(
+            user = queryset.get(
                 userId=user_id, role__in=[Roles.ADMIN.value, Roles.COACH.value]
             )
         except db.DoesNotExist:
@@ -130,16 +210,85 @@ class UserModel(db.Document):
         return user
 
     @classmethod
-    def find_all_coaches(cls) -> QuerySet:
-        return cls.objects(role__in=[Roles.ADMIN.value, Roles.COACH.value]).all()
+    def find_all_coaches(cls, only: tuple = None) -> QuerySet:
+        queryset = cls.objects(role__in=[Roles.ADMIN.value, Roles.COACH.value])
+        return queryset.only(*only) if only else queryset.all()
 
-    def add_participant_role(self) -> None:
+    @classmethod
+    def count_coaches(cls) -> int:
+        return cls.objects(role__in=[Roles.ADMIN.value, Roles.COACH.value]).count()
+
+    @classmethod
+    def add_workshop_participation(cls, user_id: str, workshop_id: str) -> UserModel:
         """
-        To use when we want to update the role of the user to participant.
-        Init data specific to the participant
-        :return:
+        Atomically register the user to a workshop, with the participant role
+        :return: The updated user, None if it does not exist
         """
-        self.role.append(Roles.PARTICIPANT.value)
-        self.workshopParticipations = []
+        user = cls.objects(userId=user_id).modify(
+            new=True,
+            add_to_set__role=Roles.PARTICIPANT.value,
+            add_to_set__workshopParticipations=workshop_id,
+        )
+        users_updated.send(cls, user_ids=[user_id])
+        return user
 
-        return
+    @classmethod
+    def add_workshops_participation(cls, user_ids: list, workshop_id: str) -> int:
+        """
+        Same as add_workshop_participation for several users, in a single update
+        :return: The number of users updated
+        """
+        count = cls.objects(userId__in=user_ids).update(
+            add_to_set__role=Roles.PARTICIPANT.value,
+            add_to_set__workshopParticipations=workshop_id,
+        )
+        users_updated.send(cls, user_ids=user_ids)
+        return count
+
+    @classmethod
+    def remove_workshops_participation(cls, user_ids: list, workshop_id: str) -> int:
+        """
+        Same as remove_workshop_participation for several users, in a single update
+        :return: The number of users updated
+        """
+        count = cls.objects(userId__in=user_ids).update(
+            pull__workshopParticipations=workshop_id
+        )
+        users_updated.send(cls, user_ids=user_ids)
+        return count
+
+    @classmethod
+    def inc_coach_stats(
+        cls, coach_id: str, workshops: int = 0, awareness_raised: int = 0
+    ) -> None:
+        """
+        Atomically update the statistics of a coach.
+        See the recompute-coach-stats command to rebuild them
+        """
+        cls.objects(userId=coach_id).update_one(
+            inc__workshopsCount=workshops, inc__awarenessRaisedCount=awareness_raised
+        )
+        users_updated.send(cls, user_ids=[coach_id])
+
+    @classmethod
+    def set_custom_batches(cls, coach_id: str) -> None:
+        """
+        Atomically flag the coach as using their own action card batches
+        """
+        cls.objects(userId=coach_id).update_one(set__customBatches=True)
+        users_updated.send(cls, user_ids=[coach_id])
+
+    @classmethod
+    def remove_workshop_participation(cls, user_id: str, workshop_id: str) -> bool:
+        """
+        Atomically unregister the user from a workshop
+        :return: False if the user does not exist
+        """
+        updated = (
+            cls.objects(userId=user_id).update_one(
+                pull__workshopParticipations=workshop_id
+            )
+            > 0
+        )
+        users_updated.send(cls, user_ids=[user_id])
+        return updated
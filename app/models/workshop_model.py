@@ -3,6 +3,8 @@ from __future__ import annotations
 import datetime
 from enum import Enum
 
+from mongoengine import QuerySet, signals
+
 from app.common.uuid_generator import generate_id
 from app.models import db
 from app.models.model_model import Model
@@ -17,10 +19,22 @@ class WorkshopParticipantStatus(Enum):
     READY = "ready"
 
 
+# User fields copied into the workshop participants
+PARTICIPANT_SNAPSHOT_FIELDS = ("firstName", "lastName", "email")
+
+
 class WorkshopParticipantModel(db.EmbeddedDocument):
 
     user = db.ReferenceField(UserModel, db_field="userId")
     status = db.StringField(max_length=32)
+    # Snapshot of the user, kept in sync by sync_participant_snapshots
+    firstName = db.StringField(max_length=64)
+    lastName = db.StringField(max_length=64)
+    email = db.StringField(max_length=256)
+
+    def set_snapshot(self, user: UserModel) -> None:
+        for field in PARTICIPANT_SNAPSHOT_FIELDS:
+            setattr(self, field, getattr(user, field))
 
 
 class WorkshopModel(db.Document):
@@ -29,7 +43,17 @@ class WorkshopModel(db.Document):
     Please inherit from it if you want to create a new type of workshop
     """
 
-    meta = {"collection": "workshops"}
+    meta = {
+        "collection": "workshops",
+        "auto_create_index": False,
+        # Workshops are listed by start date, see find_filtered
+        "indexes": [
+            {"fields": ["coachId", "startAt", "workshopId"]},
+            {"fields": ["startAt", "workshopId"]},
+            # Multikey index for the participant membership checks
+            {"fields": ["participants.user"]},
+        ],
+    }
 
     workshopId = db.StringField(primary_key=True, default=generate_id)
     name = db.StringField(
@@ -56,13 +80,125 @@ class WorkshopModel(db.Document):
         )
 
     @classmethod
-    def find_by_id(cls, workshop_id: str) -> WorkshopModel:
+    def find_by_id(cls, workshop_id: str, dereference: bool = True) -> WorkshopModel:
+        """
+        :param dereference: If False, the participant users are left as DBRef
+        (the participants snapshots are enough to dump them)
+        """
+        queryset = cls.objects if dereference else cls.objects.no_dereference()
         try:
-            workshop = cls.objects.get(workshopId=workshop_id)
+            workshop = queryset.get(workshopId=workshop_id)
         except db.DoesNotExist:
             workshop = None
         return workshop
 
+    @classmethod
+    def exists(cls, workshop_id: str) -> bool:
+        return (
+            cls.objects(workshopId=workshop_id).only("workshopId").first() is not None
+        )
+
+    @classmethod
+    def find_coach_id(cls, workshop_id: str) -> str:
+        """
+        :return: The id of the coach of the workshop, None if it does not exist
+        """
+        workshop = cls.objects(workshopId=workshop_id).only("coachId").first()
+        return None if workshop is None else workshop.coachId
+
+    @classmethod
+    def has_participant(cls, workshop_id: str, participant_id: str) -> bool:
+        return (
+            cls.objects(workshopId=workshop_id, participants__user=participant_id)
+            .only("workshopId")
+            .first()
+            is not None
+        )
+
+    @classmethod
+    def set_participant_status(
+        cls, workshop_id: str, participant_id: str, status: str
+    ) -> bool:
+        """
+        Atomically update the status of a participant of a workshop
+        :return: False if the user does not participate in the workshop
+        """
+        return (
+            cls.objects(
+                workshopId=workshop_id, participants__user=participant_id
+            ).update_one(set__participants__S__status=status)
+            > 0
+        )
+
+    @classmethod
+    def push_participants(
+        cls, workshop_id: str, workshop_participants: list
+    ) -> WorkshopModel:
+        """
+        Atomically add participants to a workshop
+        :return: The workshop before the update, with its coachId only.
+        None if it does not exist or one of the users already participates in it
+        """
+        return (
+            cls.objects(
+                workshopId=workshop_id,
+                participants__user__nin=[wp.user.id for wp in workshop_participants],
+            )
+            .only("coachId")
+            .modify(push_all__participants=workshop_participants)
+        )
+
+    @classmethod
+    def pull_participant(cls, workshop_id: str, participant_id: str) -> WorkshopModel:
+        """
+        Atomically remove a participant from a workshop
+        :return: The workshop before the update, with its coachId only.
+        None if it does not exist or the user does not participate in it
+        """
+        return (
+            cls.objects(workshopId=workshop_id, participants__user=participant_id)
+            .only("coachId")
+            .modify(__raw__={"$pull": {"participants": {"userId": participant_id}}})
+        )
+
+    @classmethod
+    def find_filtered(
+        cls,
+        coach_id: str = None,
+        start_from: datetime.datetime = None,
+        start_to: datetime.datetime = None,
+        city: str = None,
+        only: tuple = None,
+    ) -> QuerySet:
+        filters = {}
+        if coach_id is not None:
+            filters["coachId"] = coach_id
+        if start_from is not None:
+            filters["startAt__gte"] = start_from
+        if start_to is not None:
+            filters["startAt__lt"] = start_to
+        if city is not None:
+            filters["city"] = city
+        workshops = cls.objects(**filters)
+        return workshops.only(*only) if only else workshops
+
+    @classmethod
+    def find_without_participant_snapshots(cls) -> QuerySet:
+        """
+        Workshops with participants added before their snapshot existed,
+        the participant users being left as DBRef
+        """
+        return (
+            cls.objects(participants__match={"email": None})
+            .no_dereference()
+            .only("workshopId", "participants")
+        )
+
+    @classmethod
+    def estimated_count(cls) -> int:
+        # From the collection metadata, without scanning the index
+        return cls._get_collection().estimated_document_count()
+
     @classmethod
     def find_by_coach_id(cls, coach_id: str) -> WorkshopModel:
         try:
@@ -71,12 +207,50 @@ class WorkshopModel(db.Document):
             workshops = []
         return workshops
 
+    def fill_participant_snapshots(self) -> None:
+        """
+        Fill the snapshots of the participants added before they existed,
+        with a single query
+        """
+        missing = [wp for wp in self.participants if wp.email is None]
+        if len(missing) == 0:
+            return
+
+        users = {
+            user.id: user
+            for user in UserModel.find_by_ids(
+                [wp.user.id for wp in missing],
+                only=("userId",) + PARTICIPANT_SNAPSHOT_FIELDS,
+            )
+        }
+        for workshop_participant in missing:
+            user = users.get(workshop_participant.user.id)
+            if user is not None:
+                workshop_participant.set_snapshot(user)
+
     def get_participant_ids(self) -> list:
         return [p.user.id for p in self.participants]
 
-    def get_workshop_participant(self, participant_id: str):
-        for workshop_participant in self.participants:
-            if workshop_participant.user.id == participant_id:
-                return workshop_participant
 
-        return None
+def sync_participant_snapshots(sender, document: UserModel, created=False, **kwargs):
+    """
+    Fan out the name and email changes of a user to the snapshots
+    of the workshops they participate in
+    """
+    if created:
+        return
+
+    changed_fields = document._get_changed_fields()
+    if not any(field in changed_fields for field in PARTICIPANT_SNAPSHOT_FIELDS):
+        return
+
+    # The whole snapshot is set, to complete the ones missing
+    WorkshopModel.objects(participants__user=document.pk).update(
+        **{
+            "set__participants__S__{}".format(field): getattr(document, field)
+            for field in PARTICIPANT_SNAPSHOT_FIELDS
+        }
+    )
+
+
+signals.post_save.connect(sync_participant_snapshots, sender=UserModel)
@@ -21,3 +21,14 @@ class CustomSchema(Schema):
             raise InvalidDataError(details=e.messages)
 
         return data, None, 200
+
+    def load_or_400(self, data: dict) -> (dict, dict, int):
+        """
+        Same as loads_or_400 but for already parsed data (ex: query parameters)
+        """
+        try:
+            data = self.load(data)
+        except ValidationError as e:
+            raise InvalidDataError(details=e.messages)
+
+        return data, None, 200
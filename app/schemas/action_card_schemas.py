@@ -1,8 +1,24 @@
 from marshmallow import ValidationError, fields, post_load, validate
 
-from app.models.action_card_model import ActionCardModel, ActionCardType
+from app.common.cache import action_card_catalog
+from app.models.action_card_model import ActionCardType
 from app.schemas import CustomSchema
 
+# Model fields needed to dump an ActionCardSchema
+ACTION_CARD_PROJECTION = (
+    "actionCardId",
+    "cardNumber",
+    "name",
+    "category",
+    "type",
+    "key",
+    "sector",
+    "cost",
+)
+
+# Model fields needed to dump an ActionCardBatchSchema
+ACTION_CARD_BATCH_PROJECTION = ("actionCardBatchId", "name", "actionCardIds", "type")
+
 
 class ActionCardSchema(CustomSchema):
     id = fields.Str(dump_only=True)
@@ -27,9 +43,7 @@ class ActionCardBatchSchema(CustomSchema):
 
     @post_load(pass_many=True)
     def check_action_card_ids(self, data, many, **kwargs):
-        existing_action_cards = {
-            k.id: k.type for k in ActionCardModel.objects().only("actionCardId", "type")
-        }
+        existing_action_cards = action_card_catalog.get_types_by_id()
 
         for d in data:
             # Check that all ids are valid id
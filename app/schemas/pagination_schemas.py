@@ -0,0 +1,13 @@
+from marshmallow import EXCLUDE, fields, validate
+
+from app.schemas import CustomSchema
+
+
+class PaginationSchema(CustomSchema):
+    class Meta:
+        ordered = True
+        unknown = EXCLUDE
+
+    limit = fields.Integer(validate=validate.Range(min=1))
+    cursor = fields.Str()
+    includeTotal = fields.Boolean(missing=False)
@@ -0,0 +1,122 @@
+"""
+Read-only fast path of the list endpoints.
+
+The dumpers below serialize the raw documents of an as_pymongo() queryset
+exactly like the matching schema serializes the mongoengine documents, but
+without instantiating the documents first.
+Keep them in sync with the schemas : tests/test_raw_dumps.py checks the parity.
+"""
+from typing import Callable, Iterable
+
+from app.models.action_card_model import ActionCardBatchModel, ActionCardModel
+from app.models.user_model import ACCESS_LEVEL, UserModel
+from app.models.workshop_model import WorkshopModel
+
+
+def _raw_getter(document_cls: type, field_name: str) -> Callable:
+    # Mimic mongoengine when loading a whole document : unset and null values
+    # are replaced by the field default
+    field = document_cls._fields[field_name]
+
+    def get(raw: dict):
+        value = raw.get(field.db_field)
+        if value is None:
+            value = field.default() if callable(field.default) else field.default
+        return value
+
+    return get
+
+
+def _str(value):
+    return None if value is None else str(value)
+
+
+def _int(value):
+    return None if value is None else int(value)
+
+
+def _datetime(value):
+    return None if value is None else value.isoformat()
+
+
+def _str_list(value):
+    return None if value is None else [_str(v) for v in value]
+
+
+def _role(value):
+    # Same as CoachSchema.stringify_role
+    return max((r for r in value if r in ACCESS_LEVEL), key=ACCESS_LEVEL.get)
+
+
+def _make_dumper(document_cls: type, fields: tuple) -> Callable:
+    """
+    :param fields: (output key, model field, converter) in the order of the schema
+    """
+    getters = [
+        (key, _raw_getter(document_cls, field_name), convert)
+        for key, field_name, convert in fields
+    ]
+
+    def dump(raws: Iterable[dict]) -> list:
+        return [
+            {key: convert(get(raw)) for key, get, convert in getters} for raw in raws
+        ]
+
+    return dump
+
+
+# Same output as CoachSchema(many=True).dump
+dump_raw_coaches = _make_dumper(
+    UserModel,
+    (
+        ("id", "userId", _str),
+        ("firstName", "firstName", _str),
+        ("lastName", "lastName", _str),
+        ("email", "email", _str),
+        ("city", "city", _str),
+        ("role", "role", _role),
+        ("workshopsCount", "workshopsCount", _int),
+        ("awarenessRaisedCount", "awarenessRaisedCount", _int),
+    ),
+)
+
+# Same output as WorkshopSchema(many=True).dump
+dump_raw_workshops = _make_dumper(
+    WorkshopModel,
+    (
+        ("id", "workshopId", _str),
+        ("name", "name", _str),
+        ("startAt", "startAt", _datetime),
+        ("creatorId", "creatorId", _str),
+        ("coachId", "coachId", _str),
+        ("city", "city", _str),
+        ("address", "address", _str),
+        ("eventUrl", "eventUrl", _str),
+    ),
+)
+
+# Same output as ActionCardSchema(many=True).dump
+dump_raw_action_cards = _make_dumper(
+    ActionCardModel,
+    (
+        ("id", "actionCardId", _str),
+        ("cardNumber", "cardNumber", _int),
+        ("name", "name", _str),
+        ("category", "category", _str),
+        ("type", "type", _str),
+        ("key", "key", _str),
+        ("sector", "sector", _str),
+        ("cost", "cost", _int),
+    ),
+)
+
+# Same output as ActionCardBatchSchema(many=True).dump
+dump_raw_action_card_batches = _make_dumper(
+    ActionCardBatchModel,
+    (
+        ("id", "actionCardBatchId", _str),
+        ("name", "name", _str),
+        ("actionCardIds", "actionCardIds", _str_list),
+        ("type", "type", _str),
+    ),
+)
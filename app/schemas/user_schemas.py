@@ -31,6 +31,19 @@ class ParticipantSchema(UserSchema):
     workshopParticipations = fields.List(fields.Str(), dump_only=True)
 
 
+# Model fields needed to dump a CoachSchema
+COACH_PROJECTION = (
+    "userId",
+    "firstName",
+    "lastName",
+    "email",
+    "city",
+    "role",
+    "workshopsCount",
+    "awarenessRaisedCount",
+)
+
+
 class CoachSchema(UserSchema):
     password = fields.Str(
         required=True, validate=validate.Length(min=8), load_only=True
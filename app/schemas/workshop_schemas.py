@@ -1,8 +1,22 @@
-from marshmallow import fields, post_dump, validate
+import datetime
+
+from marshmallow import fields, validate
 
 from app.schemas import CustomSchema
 from app.schemas.action_card_schemas import ActionCardBatchSchema, ActionCardSchema
-from app.schemas.user_schemas import ParticipantSchema
+from app.schemas.pagination_schemas import PaginationSchema
+
+# Model fields needed to dump a WorkshopSchema
+WORKSHOP_PROJECTION = (
+    "workshopId",
+    "name",
+    "startAt",
+    "creatorId",
+    "coachId",
+    "city",
+    "address",
+    "eventUrl",
+)
 
 
 class WorkshopSchema(CustomSchema):
@@ -16,19 +30,23 @@ class WorkshopSchema(CustomSchema):
     eventUrl = fields.Str(validate=validate.Length(max=1024))
 
 
+class WorkshopFilterSchema(PaginationSchema):
+    coachId = fields.Str(validate=validate.Length(min=1))
+    # Start dates are stored as naive UTC datetimes
+    startFrom = fields.NaiveDateTime(data_key="from", timezone=datetime.timezone.utc)
+    startTo = fields.NaiveDateTime(data_key="to", timezone=datetime.timezone.utc)
+    city = fields.Str(validate=validate.Length(min=1, max=128))
+
+
 class WorkshopParticipantSchema(CustomSchema):
+    # User fields are dumped from the participant snapshot
+    id = fields.Str(attribute="user.id")
+    firstName = fields.Str()
+    lastName = fields.Str()
+    email = fields.Str()
     status = fields.Str()
-    user = fields.Nested(
-        ParticipantSchema, only=("id", "firstName", "lastName", "email")
-    )
     surveyVariables = fields.Dict(keys=fields.Str())
 
-    @post_dump
-    def flatten_participant(self, data, **kwargs):
-        data = {**data["user"], **data}
-        del data["user"]
-        return data
-
 
 class WorkshopModelSchema(CustomSchema):
     id = fields.Str()
@@ -42,19 +60,3 @@ class WorkshopModelSchema(CustomSchema):
 class WorkshopDetailSchema(WorkshopSchema):
     participants = fields.List(fields.Nested(WorkshopParticipantSchema))
     model = fields.Nested(WorkshopModelSchema)
-
-    @post_dump
-    def sort_model_action_cards(self, data, **kwargs):
-        action_cards = data["model"]["actionCards"]
-        action_cards = sorted(action_cards, key=lambda x: x["cardNumber"])
-
-        data["model"]["actionCards"] = action_cards
-        return data
-
-    @post_dump
-    def sort_model_action_card_batches(self, data, **kwargs):
-        action_card_batches = data["model"]["actionCardBatches"]
-        action_card_batches = sorted(action_card_batches, key=lambda x: x["name"])
-
-        data["model"]["actionCardBatches"] = action_card_batches
-        return data
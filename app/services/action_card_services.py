@@ -1,32 +1,44 @@
 from datetime import datetime
 
 from flask_jwt_extended import get_jwt_identity
+from pymongo import DeleteMany, InsertOne, UpdateOne
 
+from app.common.cache import action_card_catalog
 from app.common.errors import EntityNotFoundError, PermissionDeniedError
-from app.models.action_card_model import ActionCardBatchModel, ActionCardModel
+from app.models.action_card_model import ActionCardBatchModel
 from app.models.user_model import UserModel
-from app.schemas.action_card_schemas import ActionCardBatchSchema, ActionCardSchema
+from app.schemas.action_card_schemas import (
+    ACTION_CARD_BATCH_PROJECTION,
+    ActionCardBatchSchema,
+)
+from app.schemas.raw_dumps import dump_raw_action_card_batches
 
 
-def get_all_action_cards() -> (dict, int):
-    action_cards = ActionCardModel.find_all()
-    return ActionCardSchema(many=True).dump(action_cards), 200
+def get_action_cards_payload() -> (bytes, str):
+    # Same for every coach, so encoded once per catalog version
+    return action_card_catalog.get_payload()
 
 
 def get_coach_action_card_batches(coach_id: str) -> (dict, int):
+    coach = UserModel.find_coach_by_id(user_id=coach_id, only=("customBatches",))
+
     # Check if given coach_id exists in DB
-    coach = UserModel.find_coach_by_id(user_id=coach_id)
     if coach is None:
         raise EntityNotFoundError
 
     # Retrieve data
-    data = ActionCardBatchModel.find_action_card_batches_by_coach(coach_id)
-    return ActionCardBatchSchema(many=True).dump(data), 200
+    data = (
+        ActionCardBatchModel.find_effective_batches(coach_id, coach.customBatches)
+        .only(*ACTION_CARD_BATCH_PROJECTION)
+        .as_pymongo()
+    )
+    return dump_raw_action_card_batches(data), 200
 
 
 def update_coach_action_card_batches(coach_id: str, data: bytes) -> (dict, int):
+    coach = UserModel.find_coach_by_id(user_id=coach_id, only=("customBatches",))
+
     # Check if given coach_id exists in DB
-    coach = UserModel.find_coach_by_id(user_id=coach_id)
     if coach is None:
         raise EntityNotFoundError(msg="Coach does not exist")
 
@@ -42,38 +54,57 @@ def update_coach_action_card_batches(coach_id: str, data: bytes) -> (dict, int):
     if err_msg:
         return err_msg, err_code
 
-    # Retrieve current action card batches
+    # Retrieve the coach's own action card batches. A coach without any uses
+    # the default ones, which are copied on the first update : their ids are
+    # not the coach's ones, so they are inserted as new batches
     current_action_card_batches = {
-        o.actionCardBatchId: o
+        o["_id"]: o
         for o in ActionCardBatchModel.find_action_card_batches_by_coach(coach_id)
+        .only(*ACTION_CARD_BATCH_PROJECTION)
+        .as_pymongo()
     }
 
-    # Process provided data
+    # Diff provided data against the current batches
+    now = datetime.utcnow()
     output = []
+    operations = []
+    kept_ids = set()
     for d in data:
-        if (
-            "actionCardBatchId" in d
-            and d["actionCardBatchId"] in current_action_card_batches
-        ):
-            # Update action card batch if already existing
-            action_card_batch = current_action_card_batches[d["actionCardBatchId"]]
-            for k, v in d.items():
-                setattr(action_card_batch, k, v)
-            action_card_batch.updatedAt = datetime.utcnow()
+        batch_id = d.pop("id", None)
+        if batch_id in current_action_card_batches and batch_id not in kept_ids:
+            # Only set the fields which changed on an existing batch
+            action_card_batch = current_action_card_batches[batch_id]
+            changes = {k: v for k, v in d.items() if action_card_batch.get(k) != v}
+            if changes:
+                operations.append(
+                    UpdateOne(
+                        {"_id": batch_id, "coachId": coach_id},
+                        {"$set": {**changes, "updatedAt": now}},
+                    )
+                )
+                action_card_batch.update(changes)
+            kept_ids.add(batch_id)
         else:
-            # Create new object otherwise
-            action_card_batch = ActionCardBatchModel(
-                **{k: v for k, v in d.items() if k != "actionCardId"}
-            )
-
-        action_card_batch.coachId = coach_id
-        action_card_batch.save()
+            # Create new object otherwise, with a fresh id so that another
+            # coach's batch can't be overwritten
+            action_card_batch = ActionCardBatchModel(coachId=coach_id, **d)
+            action_card_batch.validate()
+            action_card_batch = action_card_batch.to_mongo().to_dict()
+            operations.append(InsertOne(action_card_batch))
         output.append(action_card_batch)
 
-    new_ids = {o.id: None for o in output}
     # Delete current action card batches that are not in provided data
-    for o_id, action_card_batch in current_action_card_batches.items():
-        if o_id not in new_ids:
-            action_card_batch.delete()
+    deleted_ids = [o_id for o_id in current_action_card_batches if o_id not in kept_ids]
+    if deleted_ids:
+        operations.append(
+            DeleteMany({"_id": {"$in": deleted_ids}, "coachId": coach_id})
+        )
+
+    ActionCardBatchModel.bulk_write(operations)
+
+    # From now on, the default batches are not used anymore, even if the coach
+    # has none left
+    if not coach.customBatches:
+        UserModel.set_custom_batches(coach_id)
 
-    return ActionCardBatchSchema(many=True).dump(output), 200
+    return dump_raw_action_card_batches(output), 200
@@ -7,8 +7,8 @@ from app.schemas.carbon_forms_schemas import CarbonFormAnswersSchema
 
 def create_carbon_form_answers(workshop_id: str, data: bytes) -> (dict, int):
     # Check existence of given workshop id
-    workshop = WorkshopModel.find_by_id(workshop_id)
-    if workshop is None:
+    coach_id = WorkshopModel.find_coach_id(workshop_id)
+    if coach_id is None:
         raise EntityNotFoundError
 
     # Deserialize data
@@ -20,7 +20,7 @@ def create_carbon_form_answers(workshop_id: str, data: bytes) -> (dict, int):
     # Check existence of given email and make sure it belongs to one of
     # the workshop's participants
     user = UserModel.find_participant_by_email(data["email"])
-    if user is None or user.id not in workshop.get_participant_ids():
+    if user is None or not WorkshopModel.has_participant(workshop_id, user.id):
         raise InvalidDataError(
             "This email does not belong to one of the workshop's participants"
         )
@@ -36,16 +36,18 @@ def create_carbon_form_answers(workshop_id: str, data: bytes) -> (dict, int):
             "Participant has already answered to the carbon form for this workshop"
         )
 
-    # Update participant status
-    wp = workshop.get_workshop_participant(participant_id=user.id)
-    wp.status = WorkshopParticipantStatus.TOCHECK.value
-
     # Save data
     carbon_form_answers = CarbonFormAnswersModel(
-        workshop=workshop.id, participant=user.id, answers=data["answers"],
+        workshop=workshop_id, participant=user.id, answers=data["answers"],
     )
     carbon_form_answers.save()
-    workshop.save()
+    # The participant has been made aware by the workshop's coach
+    UserModel.inc_coach_stats(coach_id, awareness_raised=1)
+
+    # Update participant status
+    WorkshopModel.set_participant_status(
+        workshop_id, user.id, WorkshopParticipantStatus.TOCHECK.value
+    )
 
     carbon_form_answers.reload()
     return schema.dump(carbon_form_answers), 200
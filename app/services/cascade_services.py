@@ -0,0 +1,55 @@
+from flask import current_app
+from mongoengine import QuerySet
+
+from app.common.background_tasks import background_tasks
+from app.models.action_card_model import ActionCardBatchModel
+from app.models.carbon_forms_model import CarbonFormAnswersModel
+from app.models.user_model import UserModel
+
+
+def _delete_in_batches(queryset: QuerySet, batch_size: int) -> int:
+    # Bounded delete_many, so that each one keeps the collection locks short
+    document = queryset._document
+    id_field = document._meta["id_field"]
+    count = 0
+    while True:
+        ids = list(queryset.clone().limit(batch_size).scalar(id_field))
+        if len(ids) == 0:
+            return count
+        count += document.objects(**{"{}__in".format(id_field): ids}).delete()
+
+
+def _run_cascade(task, fan_out: int, *args) -> None:
+    # Large cascades are left to a background task to keep the request fast
+    if fan_out > current_app.config["CASCADE_DELETE_DEFER_THRESHOLD"]:
+        background_tasks.submit(task, *args)
+    else:
+        task(*args)
+
+
+def delete_coach_dependencies(coach_id: str) -> None:
+    batch_size = current_app.config["CASCADE_DELETE_BATCH_SIZE"]
+    _delete_in_batches(
+        ActionCardBatchModel.find_action_card_batches_by_coach(coach_id), batch_size
+    )
+
+
+def delete_workshop_dependencies(workshop_id: str, participant_ids: list) -> None:
+    batch_size = current_app.config["CASCADE_DELETE_BATCH_SIZE"]
+    _delete_in_batches(
+        CarbonFormAnswersModel.find_all_by_workshop_id(workshop_id), batch_size
+    )
+    for i in range(0, len(participant_ids), batch_size):
+        user_ids = participant_ids[i : i + batch_size]
+        UserModel.remove_workshops_participation(user_ids, workshop_id)
+
+
+def cascade_delete_coach(coach_id: str) -> None:
+    fan_out = ActionCardBatchModel.find_action_card_batches_by_coach(coach_id).count()
+    _run_cascade(delete_coach_dependencies, fan_out, coach_id)
+
+
+def cascade_delete_workshop(workshop_id: str, participant_ids: list) -> None:
+    _run_cascade(
+        delete_workshop_dependencies, len(participant_ids), workshop_id, participant_ids
+    )
@@ -1,13 +1,18 @@
-from werkzeug.security import generate_password_hash
+from flask import current_app
 
+from app.common.cache import count_cache
 from app.common.errors import EntityNotFoundError, UserAlreadyExistsError
-from app.models.action_card_model import ActionCardBatchModel
+from app.common.pagination import paginate
+from app.common.password_hasher import password_hasher
 from app.models.user_model import Roles, UserModel
-from app.schemas.user_schemas import CoachSchema
+from app.schemas.pagination_schemas import PaginationSchema
+from app.schemas.raw_dumps import dump_raw_coaches
+from app.schemas.user_schemas import COACH_PROJECTION, CoachSchema
+from app.services.cascade_services import cascade_delete_coach
 
 
 def get_coach(coach_id) -> (dict, int):
-    coach = UserModel.find_coach_by_id(user_id=coach_id)
+    coach = UserModel.find_coach_by_id(user_id=coach_id, only=COACH_PROJECTION)
 
     # Check if given coach_id exists in DB
     if coach is None:
@@ -16,11 +21,36 @@ def get_coach(coach_id) -> (dict, int):
     return CoachSchema().dump(coach), 200
 
 
-def get_all_coachs() -> (dict, int):
-    # Get all coachs
-    coachs = UserModel.find_all_coaches()
-    schema = CoachSchema(many=True)
-    return schema.dump(coachs), 200
+def get_all_coachs(params: dict) -> (dict, int, dict):
+    params, err_msg, err_code = PaginationSchema().load_or_400(params)
+    if err_msg:
+        return err_msg, err_code, {}
+
+    limit = min(
+        params.get("limit", current_app.config["DEFAULT_PAGE_SIZE"]),
+        current_app.config["MAX_PAGE_SIZE"],
+    )
+
+    # Get a page of coachs, ordered by creation date
+    coachs, next_cursor = paginate(
+        UserModel.find_all_coaches(only=COACH_PROJECTION + ("createdAt",)).as_pymongo(),
+        order_by=("createdAt", "userId"),
+        limit=limit,
+        cursor=params.get("cursor"),
+    )
+
+    headers = {}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    if params["includeTotal"]:
+        # Estimate refreshed every COUNT_CACHE_TTL
+        total = count_cache.get("coaches")
+        if total is None:
+            total = UserModel.count_coaches()
+            count_cache.set("coaches", total)
+        headers["X-Total-Count"] = str(total)
+
+    return dump_raw_coaches(coachs), 200, headers
 
 
 def create_coach(data: bytes) -> (dict, int):
@@ -33,7 +63,8 @@ def create_coach(data: bytes) -> (dict, int):
 
     # Check if user already exist
     user = UserModel.find_by_email(data["email"])
-    if user is not None:
+    existing_user = user is not None
+    if existing_user:
         if Roles.COACH.value in user.role:
             # raise exception if user is already a coach
             raise UserAlreadyExistsError
@@ -50,20 +81,14 @@ def create_coach(data: bytes) -> (dict, int):
 
     # Encrypt password
     if user.password and user.password != "":
-        user.password = generate_password_hash(user.password)
+        user.password = password_hasher.generate(user.password)
 
     # Create user in DB
     user.save()
 
-    # Generate default action card batches
-    default_action_card_batches = ActionCardBatchModel.find_default_batches()
-    for default_action_card_batch in default_action_card_batches:
-        ActionCardBatchModel(
-            coachId=user.id,
-            name=default_action_card_batch.name,
-            actionCardIds=default_action_card_batch.actionCardIds,
-            type=default_action_card_batch.type,
-        ).save()
+    # Tokens already issued carry the previous access level
+    if existing_user:
+        user.revoke_tokens()
 
     return schema.dump(user), 200
 
@@ -75,7 +100,10 @@ def delete_coach(coach_id: str) -> (dict, int):
     if coach is None:
         raise EntityNotFoundError
 
-    # Delete user in DB
+    # Revoke the coach's tokens so that every worker rejects them, then delete
+    # user in DB and the documents depending on it
+    coach.revoke_tokens()
     coach.delete()
+    cascade_delete_coach(coach_id)
 
     return {}, 204
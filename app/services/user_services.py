@@ -1,19 +1,30 @@
+from datetime import datetime
+
+from flask import current_app
 from flask_jwt_extended import (
     create_access_token,
     decode_token,
     get_jwt_identity,
     get_raw_jwt,
 )
-from werkzeug.security import check_password_hash, generate_password_hash
 
+from app.common.access_level import ACCESS_LEVEL_CLAIM
+from app.common.cache import revoked_token_cache
 from app.common.errors import (
     EmailNotFoundError,
     EntityNotFoundError,
     InvalidPasswordError,
     InvalidTokenError,
 )
-from app.models.user_model import BlacklistTokenModel, Roles, UserModel
+from app.common.password_hasher import password_hasher
+from app.models.user_model import (
+    TOKEN_GENERATION_CLAIM,
+    BlacklistTokenModel,
+    Roles,
+    UserModel,
+)
 from app.schemas.user_schemas import (
+    COACH_PROJECTION,
     CoachSchema,
     ForgottenPasswordSchema,
     LoginSchema,
@@ -32,20 +43,37 @@ def login(data: bytes) -> (dict, int):
     if user is None:
         raise EmailNotFoundError
 
-    if not check_password_hash(pwhash=user.password, password=data["password"]):
+    if not user.password or not password_hasher.check(
+        pwhash=user.password, password=data["password"]
+    ):
         raise InvalidPasswordError
 
+    # Upgrade the password hash to the configured method
+    if password_hasher.needs_rehash(user.password):
+        user.password = password_hasher.generate(data["password"])
+        user.save()
+
+    user_claims = {TOKEN_GENERATION_CLAIM: user.tokenGeneration}
+    if current_app.config["JWT_STATELESS_AUTHORIZATION"]:
+        user_claims[ACCESS_LEVEL_CLAIM] = user.get_access_level()
+
     # Generate access token
-    access_token = create_access_token(identity=user.id, fresh=True)
+    access_token = create_access_token(
+        identity=user.id, fresh=True, user_claims=user_claims
+    )
     output_data = {"access_token": access_token}
 
     return output_data, 200
 
 
 def logout() -> (dict, int):
-    jti = get_raw_jwt()["jti"]
-    blacklisted_token = BlacklistTokenModel(token=jti)
+    raw_jwt = get_raw_jwt()
+    jti = raw_jwt["jti"]
+    blacklisted_token = BlacklistTokenModel(
+        token=jti, expiresAt=datetime.utcfromtimestamp(raw_jwt["exp"])
+    )
     blacklisted_token.save(force_insert=True)  # Inserting in DB
+    revoked_token_cache.add(jti)
 
     return None, 204
 
@@ -53,7 +81,7 @@ def logout() -> (dict, int):
 def get_me() -> (dict, int):
     current_user_id = get_jwt_identity()
 
-    current_user = UserModel().find_by_id(user_id=current_user_id)
+    current_user = UserModel.find_by_id(user_id=current_user_id, only=COACH_PROJECTION)
 
     if current_user is None:
         raise EntityNotFoundError
@@ -94,12 +122,20 @@ def update_password(params: dict, data: bytes) -> (None, int):
     if user is None:
         raise EntityNotFoundError
 
+    # Reset links are revoked once used, like any other token of the user
+    token_generation = decoded_token["user_claims"].get(TOKEN_GENERATION_CLAIM, 0)
+    if token_generation != user.tokenGeneration:
+        raise InvalidTokenError
+
     # Load new password
     data, err_msg, err_code = NewPasswordSchema().loads_or_400(data)
     if err_msg:
         return err_msg, err_code
 
-    user.password = generate_password_hash(data["password"])
+    user.password = password_hasher.generate(data["password"])
     user.save()
 
+    # Log the user out everywhere
+    user.revoke_tokens()
+
     return None, 204
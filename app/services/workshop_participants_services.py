@@ -1,4 +1,12 @@
-from app.common.errors import EntityNotFoundError, InvalidDataError
+import csv
+import io
+import json
+from enum import Enum
+
+from flask import current_app
+from mongoengine import NotUniqueError
+
+from app.common.errors import EmptyBodyError, EntityNotFoundError, InvalidDataError
 from app.models.user_model import Roles, UserModel
 from app.models.workshop_model import (
     WorkshopModel,
@@ -8,12 +16,20 @@ from app.models.workshop_model import (
 from app.schemas.user_schemas import ParticipantSchema
 
 
-def add_participant(workshop_id, data) -> (dict, int):
-    workshop = WorkshopModel.find_by_id(workshop_id=workshop_id)
-    # Check if given workshop_id exists in DB
-    if workshop is None:
-        raise EntityNotFoundError
+class BulkParticipantStatus(Enum):
+    """
+    Status of the rows of a bulk registration,
+    on top of the WorkshopParticipantStatus of the registered ones
+    """
 
+    INVALID = "invalid"
+    DUPLICATE = "duplicate"
+    ALREADY_REGISTERED = "alreadyregistered"
+    # The user could not be created (ex: registered by another request meanwhile)
+    FAILED = "failed"
+
+
+def add_participant(workshop_id, data) -> (dict, int):
     # Deserialize data
     schema = ParticipantSchema()
     data, err_msg, err_code = schema.loads_or_400(data)
@@ -23,6 +39,8 @@ def add_participant(workshop_id, data) -> (dict, int):
     # Check if there is already a participant with this email in DB
     user = UserModel.find_by_email(data.get("email"))
     if user is None:
+        # Persist a new participant first, so that the workshop never refers
+        # to a user which could not be created
         participant = UserModel(
             email=data.get("email"),
             firstName=data.get("firstName"),
@@ -30,53 +48,175 @@ def add_participant(workshop_id, data) -> (dict, int):
             role=[Roles.PARTICIPANT.value],
             workshopParticipations=[workshop_id],
         )
+        try:
+            participant.save()
+        except NotUniqueError:
+            # Created by another request meanwhile : register that user
+            user = UserModel.find_by_email(data.get("email"))
+            if user is None:
+                raise
 
+    if user is None:
         status = WorkshopParticipantStatus.CREATED.value
     else:
-        # If user already exists, check if it's a participant
+        participant = user
+        # Add the participant role to the user otherwise
         if Roles.PARTICIPANT.value in user.role:
-            # Raise error if participant already registred in workshop
-            if user.userId in [p.user.id for p in workshop.participants]:
-                raise InvalidDataError(
-                    msg="Participant already registered for this workshop"
-                )
             status = WorkshopParticipantStatus.EXISTING.value
         else:
-            # add participant role otherwise
-            user.add_participant_role()
             status = WorkshopParticipantStatus.CREATED.value
 
-        participant = user
-        participant.workshopParticipations.append(workshop_id)
-
-    # Append participant to workshop
-    workshop.participants.append(
-        WorkshopParticipantModel(user=participant.userId, status=status)
-    )
+    # Append participant to workshop, unless already registered
+    workshop_participant = WorkshopParticipantModel(user=participant, status=status)
+    workshop_participant.set_snapshot(participant)
+    workshop = WorkshopModel.push_participants(workshop_id, [workshop_participant])
+    if workshop is None:
+        if user is None:
+            participant.delete()
+        # Check if given workshop_id exists in DB
+        if not WorkshopModel.exists(workshop_id):
+            raise EntityNotFoundError
+        raise InvalidDataError(msg="Participant already registered for this workshop")
 
-    # Persist in DB
-    participant.save()
-    workshop.save()
+    if user is not None:
+        participant = UserModel.add_workshop_participation(user.userId, workshop_id)
 
     return schema.dump(participant), 200
 
 
 def remove_participant(workshop_id, participant_id) -> (dict, int):
-    workshop = WorkshopModel.find_by_id(workshop_id=workshop_id)
-    user = UserModel.find_by_id(participant_id)
-    # Check if given workshop_id exists in DB
-    if workshop is None or user is None:
+    workshop = WorkshopModel.pull_participant(workshop_id, participant_id)
+    removed_from_user = UserModel.remove_workshop_participation(
+        participant_id, workshop_id
+    )
+    # Check if given workshop_id and participant_id exist in DB
+    if not removed_from_user or (
+        workshop is None and not WorkshopModel.exists(workshop_id)
+    ):
         raise EntityNotFoundError
-    updated_participants = []
-    for participant in workshop.participants:
-        if participant.user.userId != participant_id:
-            updated_participants.append(participant)
-    workshop.participants = updated_participants
-    updated_workshop = []
-    for registered in user.workshopParticipations:
-        if registered != workshop_id:
-            updated_workshop.append(registered)
-    user.workshopParticipations = updated_workshop
-    workshop.save()
-    user.save()
+
     return None, 204
+
+
+def _parse_participant_rows(data: bytes, content_type: str) -> list:
+    if len(data) == 0:
+        raise EmptyBodyError
+
+    try:
+        if content_type == "text/csv":
+            # CSV with a header line : email,firstName,lastName
+            rows = list(csv.DictReader(io.StringIO(data.decode("utf-8-sig"))))
+        else:
+            rows = json.loads(data)
+    except (UnicodeDecodeError, ValueError, csv.Error):
+        raise InvalidDataError(msg="Unable to parse the participants.")
+
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        raise InvalidDataError(msg="A list of participants is expected.")
+    max_size = current_app.config["PARTICIPANTS_BULK_MAX_SIZE"]
+    if len(rows) > max_size:
+        raise InvalidDataError(
+            msg="Cannot register more than {} participants at once.".format(max_size)
+        )
+    return rows
+
+
+def add_participants(workshop_id, data: bytes, content_type: str) -> (dict, int):
+    rows = _parse_participant_rows(data, content_type)
+
+    # Check if given workshop_id exists in DB
+    if not WorkshopModel.exists(workshop_id):
+        raise EntityNotFoundError
+
+    # Validate each row on its own, so that one bad row does not reject the others
+    schema = ParticipantSchema()
+    output = []
+    valid_rows = {}
+    for row in rows:
+        errors = schema.validate(row)
+        email = row.get("email")
+        if errors:
+            output.append(
+                dict(
+                    email=email,
+                    status=BulkParticipantStatus.INVALID.value,
+                    details=errors,
+                )
+            )
+        elif email in valid_rows:
+            output.append(
+                dict(email=email, status=BulkParticipantStatus.DUPLICATE.value)
+            )
+        else:
+            valid_rows[email] = schema.load(row)
+            output.append(dict(email=email, status=None))
+
+    # Resolve the existing users in a single query
+    existing_users = {
+        user.email: user for user in UserModel.find_by_emails(list(valid_rows))
+    }
+
+    new_users = []
+    updated_user_ids = []
+    registrations = []
+    for row_output in output:
+        if row_output["status"] is not None:
+            continue
+        row = valid_rows[row_output["email"]]
+        user = existing_users.get(row["email"])
+        if user is None:
+            user = UserModel(
+                email=row["email"],
+                firstName=row["firstName"],
+                lastName=row["lastName"],
+                role=[Roles.PARTICIPANT.value],
+                workshopParticipations=[workshop_id],
+            )
+            new_users.append(user)
+            status = WorkshopParticipantStatus.CREATED.value
+        elif workshop_id in user.workshopParticipations:
+            # Registrations are stored on both sides, no need to load the workshop
+            row_output["id"] = user.userId
+            row_output["status"] = BulkParticipantStatus.ALREADY_REGISTERED.value
+            continue
+        else:
+            updated_user_ids.append(user.userId)
+            # The participant role is added to the user otherwise
+            if Roles.PARTICIPANT.value in user.role:
+                status = WorkshopParticipantStatus.EXISTING.value
+            else:
+                status = WorkshopParticipantStatus.CREATED.value
+        registrations.append((row_output, user, status))
+
+    # Persist the new participants first, so that the workshop never refers to
+    # users which could not be created
+    inserted_user_ids = UserModel.insert_all(new_users) if new_users else set()
+    failed_user_ids = {user.userId for user in new_users} - inserted_user_ids
+
+    workshop_participants = []
+    for row_output, user, status in registrations:
+        if user.userId in failed_user_ids:
+            row_output["status"] = BulkParticipantStatus.FAILED.value
+            continue
+        workshop_participant = WorkshopParticipantModel(user=user, status=status)
+        workshop_participant.set_snapshot(user)
+        workshop_participants.append(workshop_participant)
+        row_output["id"] = user.userId
+        row_output["status"] = status
+
+    if len(workshop_participants) == 0:
+        return output, 200
+
+    # Append participants to workshop, unless one of them got registered meanwhile
+    workshop = WorkshopModel.push_participants(workshop_id, workshop_participants)
+    if workshop is None:
+        if inserted_user_ids:
+            UserModel.find_by_ids(list(inserted_user_ids)).delete()
+        raise InvalidDataError(
+            msg="Participants were registered concurrently, please retry."
+        )
+
+    if updated_user_ids:
+        UserModel.add_workshops_participation(updated_user_ids, workshop_id)
+
+    return output, 200
@@ -1,28 +1,43 @@
+from flask import current_app
 from flask_jwt_extended import get_jwt_identity
 
+from app.common.cache import action_card_catalog, count_cache
 from app.common.errors import EntityNotFoundError, InvalidDataError
-from app.models.action_card_model import ActionCardBatchModel, ActionCardModel
+from app.common.pagination import paginate
+from app.models.action_card_model import ActionCardBatchModel
 from app.models.carbon_forms_model import CarbonFormAnswersModel
 from app.models.model_model import Model
 from app.models.user_model import UserModel
 from app.models.workshop_model import WorkshopModel
-from app.schemas.workshop_schemas import WorkshopDetailSchema, WorkshopSchema
+from app.schemas.raw_dumps import dump_raw_workshops
+from app.schemas.workshop_schemas import (
+    WORKSHOP_PROJECTION,
+    WorkshopDetailSchema,
+    WorkshopFilterSchema,
+    WorkshopSchema,
+)
+from app.services.cascade_services import cascade_delete_workshop
 
 
 def get_workshop(workshop_id) -> (dict, int):
-    workshop = WorkshopModel.find_by_id(workshop_id=workshop_id)
+    workshop = WorkshopModel.find_by_id(workshop_id=workshop_id, dereference=False)
 
     # Check if given workshop_id exists in DB
     if workshop is None:
         raise EntityNotFoundError
 
+    # Participants are dumped from their snapshot, no need to load the users
+    workshop.model = Model.find_by_id(workshop.model.id)
+    workshop.fill_participant_snapshots()
+
     # Append action cards to field model
-    action_cards = ActionCardModel.find_all()
-    workshop.model.actionCards = action_cards
+    workshop.model.actionCards = action_card_catalog.get_cards()
 
     # Append action card batches from creator to field model
-    action_cards_batches = ActionCardBatchModel.find_action_card_batches_by_coach(
-        coach_id=workshop.coachId
+    coach = UserModel.find_by_id(workshop.coachId, only=("customBatches",))
+    action_cards_batches = ActionCardBatchModel.find_effective_batches(
+        coach_id=workshop.coachId,
+        custom_batches=coach is not None and coach.customBatches,
     )
     workshop.model.actionCardBatches = action_cards_batches
 
@@ -38,10 +53,47 @@ def get_workshop(workshop_id) -> (dict, int):
     return WorkshopDetailSchema().dump(workshop), 200
 
 
-def get_workshops() -> (dict, int):
-    # Get all workshop from a given coach
-    workshops = WorkshopModel.objects()
-    return WorkshopSchema(many=True).dump(workshops), 200
+def get_workshops(params: dict) -> (dict, int, dict):
+    params, err_msg, err_code = WorkshopFilterSchema().load_or_400(params)
+    if err_msg:
+        return err_msg, err_code, {}
+
+    limit = min(
+        params.get("limit", current_app.config["DEFAULT_PAGE_SIZE"]),
+        current_app.config["MAX_PAGE_SIZE"],
+    )
+
+    filters = dict(
+        coach_id=params.get("coachId"),
+        start_from=params.get("startFrom"),
+        start_to=params.get("startTo"),
+        city=params.get("city"),
+    )
+
+    # Get a page of the matching workshops, ordered by start date
+    workshops, next_cursor = paginate(
+        WorkshopModel.find_filtered(only=WORKSHOP_PROJECTION, **filters).as_pymongo(),
+        order_by=("startAt", "workshopId"),
+        limit=limit,
+        cursor=params.get("cursor"),
+    )
+
+    headers = {}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = next_cursor
+    if params["includeTotal"]:
+        # Estimate refreshed every COUNT_CACHE_TTL, for each filter
+        count_key = ("workshops",) + tuple(filters.values())
+        total = count_cache.get(count_key)
+        if total is None:
+            if any(v is not None for v in filters.values()):
+                total = WorkshopModel.find_filtered(**filters).count()
+            else:
+                total = WorkshopModel.estimated_count()
+            count_cache.set(count_key, total)
+        headers["X-Total-Count"] = str(total)
+
+    return dump_raw_workshops(workshops), 200, headers
 
 
 def create_workshop(data: bytes) -> (dict, int):
@@ -65,18 +117,29 @@ def create_workshop(data: bytes) -> (dict, int):
     workshop.model = model
 
     workshop.save()
+    UserModel.inc_coach_stats(coach_id, workshops=1)
 
     workshop.reload()
     return schema.dump(workshop), 200
 
 
 def delete_workshop(workshop_id: str) -> (dict, int):
-    workshop = WorkshopModel.find_by_id(workshop_id=workshop_id)
+    # Only the participant ids are needed
+    workshop = WorkshopModel.find_by_id(workshop_id=workshop_id, dereference=False)
 
-    # Check if given coach_id exists in DB
+    # Check if given workshop_id exists in DB
     if workshop is None:
         raise EntityNotFoundError
-    # Delete user in DB
+    # Carbon forms submitted to the workshop, deleted along with it
+    carbon_forms_count = CarbonFormAnswersModel.find_all_by_workshop_id(
+        workshop_id
+    ).count()
+
+    # Delete workshop in DB, then the documents depending on it
     workshop.delete()
+    UserModel.inc_coach_stats(
+        workshop.coachId, workshops=-1, awareness_raised=-carbon_forms_count
+    )
+    cascade_delete_workshop(workshop_id, workshop.get_participant_ids())
 
     return {}, 204
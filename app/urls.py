@@ -11,6 +11,7 @@ from app.api.v1.user_views import (
 )
 from app.api.v1.workshop_views import (
     WorkshopListView,
+    WorkshopParticipantBulkView,
     WorkshopParticipantListView,
     WorkshopParticipantView,
     WorkshopView,
@@ -75,6 +76,12 @@ urlpatterns = [
         endpoint="workshop-participant-list",
         methods=["POST"],
     ),
+    dict(
+        view=WorkshopParticipantBulkView,
+        url="/api/v1/workshops/<string:workshop_id>/participants/bulk",
+        endpoint="workshop-participant-bulk",
+        methods=["POST"],
+    ),
     dict(
         view=WorkshopParticipantView,
         url="/api/v1/workshops/<string:workshop_id>/"
@@ -6,6 +6,7 @@ from mongoengine import get_db
 from werkzeug.security import generate_password_hash
 
 from app import create_app
+from app.cli import INDEXED_MODELS
 from app.common.mail import mail as _mail
 from app.models import db as _db
 from app.models.action_card_model import (
@@ -59,6 +60,9 @@ def db(app, request):
     _db.app = app
 
     # Add init DB here
+    # Indexes as built by flask ensure-indexes on a deployment
+    for model in INDEXED_MODELS:
+        model.ensure_indexes()
 
     def teardown():
         me = get_db()
@@ -1,6 +1,13 @@
 import json
 
-from app.models.action_card_model import ActionCardBatchModel, ActionCardType
+from app.common.cache import action_card_catalog
+from app.common.cache.action_card_catalog import CATALOG_NAME
+from app.models.action_card_model import (
+    ActionCardBatchModel,
+    ActionCardModel,
+    ActionCardType,
+)
+from app.models.catalog_version_model import CatalogVersionModel
 from app.models.city_model import Cities
 from app.models.user_model import Roles, UserModel
 
@@ -27,6 +34,57 @@ def test_get_action_cards(client, auth, coach, action_cards):
     assert response_data[0] == expected_first_result
 
 
+def test_get_action_cards_not_modified(client, auth, coach, action_cards):
+    headers = auth.login(email=coach.email)
+
+    response = client.get("/api/v1/action_cards", headers=headers)
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+    assert response.mimetype == "application/json"
+
+    response = client.get(
+        "/api/v1/action_cards", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 304
+    assert response.data == b""
+
+    # A new version of the catalog changes the ETag
+    action_cards[0].cost = 10
+    action_cards[0].save()
+    response = client.get(
+        "/api/v1/action_cards", headers={**headers, "If-None-Match": etag}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_action_card_catalog(action_cards, monkeypatch, request):
+    monkeypatch.setattr(action_card_catalog, "revalidate_interval", 0)
+    assert len(action_card_catalog.get_cards()) == 3
+
+    # Insert a card the way another worker would (no signal in this one)
+    action_card4 = ActionCardModel(
+        cardNumber=4,
+        name="action_card_name_4",
+        category="action_card_category_4",
+        type=ActionCardType.COLLECTIVE.value,
+        key="action_card_key_4",
+        sector="action_card_sector_4",
+        cost=4,
+    )
+    ActionCardModel.objects.insert(action_card4, signal_kwargs={})
+    request.addfinalizer(action_card4.delete)
+    assert len(action_card_catalog.get_cards()) == 3
+
+    CatalogVersionModel.bump(CATALOG_NAME)
+    assert len(action_card_catalog.get_cards()) == 4
+    assert (
+        action_card_catalog.get_types_by_id()[action_card4.id]
+        == ActionCardType.COLLECTIVE.value
+    )
+    assert action_card_catalog.get_cards_by_id()[action_card4.id]["cardNumber"] == 4
+
+
 def test_get_action_card_batches(client, auth, coach, action_card_batches):
     headers = auth.login(email=coach.email)
 
@@ -47,6 +105,44 @@ def test_get_action_card_batches(client, auth, coach, action_card_batches):
     assert response_data[0] == expected_first_result
 
 
+def test_action_cards_ordering(
+    client, auth, coach, action_cards, action_card_batches, request
+):
+    # Inserted last, but first in the orderings
+    action_card0 = ActionCardModel(
+        cardNumber=0,
+        name="action_card_name_0",
+        category="action_card_category_0",
+        type=ActionCardType.INDIVIDUAL.value,
+        key="action_card_key_0",
+        sector="action_card_sector_0",
+        cost=0,
+    )
+    action_card0.save()
+    request.addfinalizer(action_card0.delete)
+    action_card_batch0 = ActionCardBatchModel(
+        coachId=coach.id,
+        name="action_card_batch_name_0",
+        type=ActionCardType.INDIVIDUAL.value,
+        actionCardIds=[action_card0.id],
+    )
+    action_card_batch0.save()
+    request.addfinalizer(action_card_batch0.delete)
+    headers = auth.login(email=coach.email)
+
+    response = client.get("/api/v1/action_cards", headers=headers)
+    response_data = json.loads(response.data)
+    assert response_data == sorted(response_data, key=lambda c: c["cardNumber"])
+    assert response_data[0]["id"] == action_card0.id
+
+    response = client.get(
+        "/api/v1/coaches/{}/action_card_batches".format(coach.id), headers=headers,
+    )
+    response_data = json.loads(response.data)
+    assert response_data == sorted(response_data, key=lambda b: b["name"])
+    assert response_data[0]["id"] == action_card_batch0.id
+
+
 def test_put_action_card_batches_success(
     client, auth, coach, action_cards, action_card_batches
 ):
@@ -86,6 +182,79 @@ def test_put_action_card_batches_success(
     )
 
 
+def test_put_action_card_batches_diff(
+    client,
+    auth,
+    coach,
+    action_cards,
+    action_card_batches,
+    default_action_card_batches,
+    request,
+):
+    action_card_batch1, action_card_batch2 = action_card_batches
+    action_card_batch1.actionCardIds = [action_cards[0].id, action_cards[1].id]
+    action_card_batch1.save()
+    action_card_batch1.reload()
+    request.addfinalizer(
+        lambda: ActionCardBatchModel.find_action_card_batches_by_coach(
+            coach.id
+        ).delete()
+    )
+    headers = auth.login(email=coach.email)
+
+    data = [
+        # Unchanged
+        {
+            "id": action_card_batch1.id,
+            "name": action_card_batch1.name,
+            "type": action_card_batch1.type,
+            "actionCardIds": action_card_batch1.actionCardIds,
+        },
+        # Id of a batch which is not the coach's one
+        {
+            "id": default_action_card_batches[1].id,
+            "name": "action_card_batch_name_3",
+            "type": ActionCardType.COLLECTIVE.value,
+            "actionCardIds": [action_cards[2].id],
+        },
+    ]
+    response = client.put(
+        "/api/v1/coaches/{}/action_card_batches".format(coach.id),
+        headers=headers,
+        data=json.dumps(data),
+    )
+    response_data, status_code = json.loads(response.data), response.status_code
+
+    assert status_code == 200
+    assert response_data[0] == data[0]
+    assert response_data[1]["id"] != default_action_card_batches[1].id
+    assert response_data[1]["name"] == "action_card_batch_name_3"
+
+    batches = ActionCardBatchModel.find_action_card_batches_by_coach(coach.id)
+    assert [b.id for b in batches] == [response_data[0]["id"], response_data[1]["id"]]
+    assert batches[0].updatedAt == action_card_batch1.updatedAt
+    assert batches[1].createdAt is not None
+    # Removed from the coach's batches, other batches untouched
+    assert (
+        ActionCardBatchModel.objects(actionCardBatchId=action_card_batch2.id).count()
+        == 0
+    )
+    default_action_card_batches[1].reload()
+    assert default_action_card_batches[1].name == "action_card_batch_name_2"
+
+    # Only the changed fields are updated
+    data[0]["name"] = "action_card_batch_name_1_bis"
+    response = client.put(
+        "/api/v1/coaches/{}/action_card_batches".format(coach.id),
+        headers=headers,
+        data=json.dumps(data),
+    )
+    assert response.status_code == 200
+    batches = ActionCardBatchModel.find_action_card_batches_by_coach(coach.id)
+    assert batches[0].name == "action_card_batch_name_1_bis"
+    assert batches[0].updatedAt > action_card_batch1.updatedAt
+
+
 def test_put_action_card_batches_incorrect_action_card_ids(
     client, auth, coach, action_cards
 ):
@@ -200,7 +369,7 @@ def test_put_action_card_batches_invalid_action_card_mix(
 
 
 def test_default_batches_at_coach_creation(
-    client, auth, admin, default_action_card_batches, request
+    client, auth, admin, action_cards, default_action_card_batches, request
 ):
     headers = auth.login(email="admin@test.com")
     data = dict(
@@ -215,13 +384,77 @@ def test_default_batches_at_coach_creation(
     response = client.post("/api/v1/coaches", headers=headers, data=json.dumps(data))
     coach_id = json.loads(response.data)["id"]
 
+    def teardown():
+        ActionCardBatchModel.find_action_card_batches_by_coach(coach_id).delete()
+        UserModel.find_coach_by_id(coach_id).delete()
+
+    request.addfinalizer(teardown)
+
+    # The coach uses the default batches, without copying them
+    assert len(ActionCardBatchModel.find_action_card_batches_by_coach(coach_id)) == 0
+    headers = auth.login(email="coach20@test.com")
+    response = client.get(
+        "/api/v1/coaches/{}/action_card_batches".format(coach_id), headers=headers
+    )
+    response_data = json.loads(response.data)
+    assert [b["id"] for b in response_data] == [
+        b.id for b in default_action_card_batches
+    ]
+
+    # The default batches are copied on the first update
+    data = [
+        {
+            "id": default_action_card_batches[0].id,
+            "name": default_action_card_batches[0].name,
+            "type": ActionCardType.INDIVIDUAL.value,
+            "actionCardIds": [action_cards[0].id, action_cards[1].id],
+        },
+        {
+            "id": default_action_card_batches[1].id,
+            "name": default_action_card_batches[1].name,
+            "type": ActionCardType.COLLECTIVE.value,
+            "actionCardIds": [action_cards[2].id],
+        },
+    ]
+    response = client.put(
+        "/api/v1/coaches/{}/action_card_batches".format(coach_id),
+        headers=headers,
+        data=json.dumps(data),
+    )
+    assert response.status_code == 200
+
     coach_action_card_batches = ActionCardBatchModel.find_action_card_batches_by_coach(
         coach_id
     )
     assert len(coach_action_card_batches) == 2
     assert coach_action_card_batches[0].name == default_action_card_batches[0].name
+    assert coach_action_card_batches[0].id != default_action_card_batches[0].id
+    assert len(ActionCardBatchModel.find_default_batches()) == 2
 
-    def teardown():
-        UserModel.find_coach_by_id(coach_id).delete()
 
-    request.addfinalizer(teardown)
+def test_put_empty_action_card_batches(client, auth, coach, request):
+    # No action card in the catalog : an empty list of batches is valid
+    default_action_card_batch = ActionCardBatchModel(
+        default=True,
+        name="action_card_batch_name_1",
+        type=ActionCardType.INDIVIDUAL.value,
+        actionCardIds=["1"],
+    )
+    default_action_card_batch.save()
+    request.addfinalizer(default_action_card_batch.delete)
+    headers = auth.login(email=coach.email)
+    url = "/api/v1/coaches/{}/action_card_batches".format(coach.id)
+
+    response = client.get(url, headers=headers)
+    response_data = json.loads(response.data)
+    assert [b["id"] for b in response_data] == [default_action_card_batch.id]
+
+    response = client.put(url, headers=headers, data=json.dumps([]))
+    assert response.status_code == 200
+    assert json.loads(response.data) == []
+    assert UserModel.find_by_id(coach.id).customBatches is True
+
+    # The coach does not fall back to the default batches
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert json.loads(response.data) == []
@@ -5,7 +5,7 @@ from app.models.carbon_forms_model import CarbonFormAnswersModel
 from app.models.workshop_model import WorkshopParticipantStatus
 
 
-def test_post_carbon_form_answers(client, workshop, participant):
+def test_post_carbon_form_answers(client, coach, workshop, participant):
     count = len(CarbonFormAnswersModel.objects)
 
     data = {
@@ -31,6 +31,8 @@ def test_post_carbon_form_answers(client, workshop, participant):
     assert len(CarbonFormAnswersModel.objects) == count + 1
     assert response_data == expected_result
     assert workshop.participants[0].status == WorkshopParticipantStatus.TOCHECK.value
+    coach.reload()
+    assert coach.awarenessRaisedCount == 1
 
 
 def test_post_carbon_form_answers_inexisting_workshop(client):
@@ -85,7 +87,7 @@ def test_post_carbon_form_answers_participant_not_in_workshop(
 
 
 def test_post_carbon_form_answers_already_existing(
-    client, workshop, participant, carbon_form_answers
+    client, coach, workshop, participant, carbon_form_answers
 ):
     data = {
         "email": participant.email,
@@ -102,3 +104,5 @@ def test_post_carbon_form_answers_already_existing(
         "Participant has already answered to the carbon form for this workshop"
         in str(response_data)
     )
+    coach.reload()
+    assert not coach.awarenessRaisedCount
@@ -1,13 +1,28 @@
+import datetime
 import json
 import os
 from csv import DictReader
 
+import pytest
 from werkzeug.security import check_password_hash
 
-from app.cli import create_admin, importcsv, importjson
+from app.cli import (
+    EXPLAINED_QUERIES,
+    INDEXED_MODELS,
+    backfill_blacklist_expiry,
+    backfill_participant_snapshots,
+    create_admin,
+    ensure_indexes,
+    importcsv,
+    importjson,
+    recompute_coach_stats,
+)
+from app.common.cache.action_card_catalog import CATALOG_NAME
 from app.models.action_card_model import ActionCardBatchModel, ActionCardModel
+from app.models.catalog_version_model import CatalogVersionModel
 from app.models.model_model import Model
-from app.models.user_model import UserModel
+from app.models.user_model import BlacklistTokenModel, UserModel
+from app.models.workshop_model import WorkshopModel
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -89,12 +104,14 @@ def test_importcsv_no_drop(cli_runner, db, request):
         for _ in reader:
             count += 1
 
+    version = CatalogVersionModel.get_version(CATALOG_NAME)
     result = cli_runner.invoke(importcsv, [collection, csv_file])
     assert (
         "Successfully inserted {} objects in collection {}".format(count, collection)
         in result.output
     )
     assert len(ActionCardModel.find_all()) == count + 1
+    assert CatalogVersionModel.get_version(CATALOG_NAME) == version + 1
 
     def teardown():
         ActionCardModel.drop_collection()
@@ -216,3 +233,101 @@ def test_importjson_without_drop(cli_runner, db, request):
         Model.drop_collection()
 
     request.addfinalizer(teardown)
+
+
+def test_backfill_blacklist_expiry(app, cli_runner, db, request):
+    blacklisted_token1 = BlacklistTokenModel(token="jti_1")
+    blacklisted_token2 = BlacklistTokenModel(
+        token="jti_2", expiresAt=datetime.datetime(2020, 1, 1)
+    )
+    blacklisted_token1.save()
+    blacklisted_token2.save()
+
+    result = cli_runner.invoke(backfill_blacklist_expiry, ["--batch-size", "1"])
+    blacklisted_token1.reload()
+    blacklisted_token2.reload()
+
+    assert "Successfully set the expiry of 1 tokens" in result.output
+    assert (
+        blacklisted_token1.expiresAt
+        == blacklisted_token1.blacklistedOn + app.config["JWT_ACCESS_TOKEN_EXPIRES"]
+    )
+    assert blacklisted_token2.expiresAt == datetime.datetime(2020, 1, 1)
+
+    def teardown():
+        blacklisted_token1.delete()
+        blacklisted_token2.delete()
+
+    request.addfinalizer(teardown)
+
+
+def test_ensure_indexes(cli_runner, db):
+    result = cli_runner.invoke(ensure_indexes)
+
+    assert "Indexes of collection users ensured" in result.output
+    assert "role_1_createdAt_1__id_1" in UserModel._get_collection().index_information()
+    assert (
+        "participants.userId_1" in WorkshopModel._get_collection().index_information()
+    )
+    for name in EXPLAINED_QUERIES:
+        assert name in result.output
+
+
+@pytest.mark.parametrize(
+    "model", [m for m in INDEXED_MODELS if m._meta.get("auto_create_index") is False],
+)
+def test_indexes_only_built_by_ensure_indexes(cli_runner, db, model, monkeypatch):
+    model._get_collection().drop_indexes()
+    # First use of the model by a new worker
+    monkeypatch.setattr(model, "_collection", None)
+
+    def declared_indexes():
+        return set(model._get_collection().index_information().keys()) - {"_id_"}
+
+    assert declared_indexes() == set()
+    model.objects.first()
+    assert declared_indexes() == set()
+
+    cli_runner.invoke(ensure_indexes, ["--no-explain"])
+    assert len(declared_indexes()) == len(model._meta["index_specs"])
+
+
+def test_recompute_coach_stats(
+    cli_runner, admin, coach, workshop, workshops, carbon_form_answers
+):
+    UserModel.objects(userId=admin.id).update_one(set__workshopsCount=5)
+
+    result = cli_runner.invoke(recompute_coach_stats, ["--batch-size", "1"])
+    admin.reload()
+    coach.reload()
+
+    assert "Successfully updated the statistics of 2 coaches" in result.output
+    assert admin.workshopsCount == 0
+    assert admin.awarenessRaisedCount == 0
+    assert coach.workshopsCount == 3
+    assert coach.awarenessRaisedCount == 1
+
+
+def test_backfill_participant_snapshots(cli_runner, workshop, participant):
+    # Participant added before the snapshot existed
+    WorkshopModel._get_collection().update_one(
+        {"_id": workshop.id},
+        {
+            "$unset": {
+                "participants.0.firstName": "",
+                "participants.0.lastName": "",
+                "participants.0.email": "",
+            }
+        },
+    )
+
+    result = cli_runner.invoke(backfill_participant_snapshots, ["--batch-size", "1"])
+    workshop.reload()
+
+    assert "Successfully stored the snapshot of 1 participants" in result.output
+    assert workshop.participants[0].firstName == participant.firstName
+    assert workshop.participants[0].lastName == participant.lastName
+    assert workshop.participants[0].email == participant.email
+
+    result = cli_runner.invoke(backfill_participant_snapshots)
+    assert "Successfully stored the snapshot of 0 participants" in result.output
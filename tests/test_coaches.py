@@ -2,13 +2,17 @@ import json
 
 import pytest
 
+from app.common.cache import count_cache
 from app.common.errors import (
     EmptyBodyError,
     EntityNotFoundError,
+    InvalidDataError,
     UserAlreadyExistsError,
 )
+from app.models.action_card_model import ActionCardBatchModel
 from app.models.city_model import Cities
 from app.models.user_model import Roles, UserModel
+from app.schemas.user_schemas import COACH_PROJECTION
 
 valid_coach_data = [
     dict(
@@ -48,6 +52,14 @@ def test_get_coach(client, auth, coach):
     assert response_data["email"] == "coach@test.com"
 
 
+def test_find_coach_projection(coach):
+    projected_coach = UserModel.find_coach_by_id(coach.id, only=COACH_PROJECTION)
+
+    assert projected_coach.email == coach.email
+    assert projected_coach.password is None
+    assert UserModel.find_coach_by_id("inexistingId", only=COACH_PROJECTION) is None
+
+
 def test_get_coaches(client, auth, admin, coaches):
     headers = auth.login(email="admin@test.com")
 
@@ -58,6 +70,44 @@ def test_get_coaches(client, auth, admin, coaches):
     assert len(response_data) == len(coaches) + 1  # Adding 1 for the admin user
 
 
+def test_get_coaches_paginated(client, auth, admin, coaches):
+    count_cache.clear()
+    headers = auth.login(email="admin@test.com")
+
+    response = client.get(
+        "/api/v1/coaches",
+        headers=headers,
+        query_string={"limit": 3, "includeTotal": "true"},
+    )
+    first_page = json.loads(response.data)
+    assert response.status_code == 200
+    assert len(first_page) == 3
+    assert response.headers["X-Total-Count"] == str(len(coaches) + 1)
+
+    response = client.get(
+        "/api/v1/coaches",
+        headers=headers,
+        query_string={"limit": 3, "cursor": response.headers["X-Next-Cursor"]},
+    )
+    second_page = json.loads(response.data)
+    assert response.status_code == 200
+    assert len(second_page) == 1
+    assert "X-Next-Cursor" not in response.headers
+
+    coach_ids = [c["id"] for c in first_page + second_page]
+    assert sorted(coach_ids) == sorted([c.id for c in coaches] + [admin.id])
+
+
+def test_get_coaches_invalid_cursor(client, auth, admin):
+    headers = auth.login(email="admin@test.com")
+
+    response = client.get(
+        "/api/v1/coaches", headers=headers, query_string={"cursor": "invalid"}
+    )
+
+    assert response.status_code == InvalidDataError.code
+
+
 def test_post_coaches_already_existing(client, auth, admin, coach):
     data = dict(
         firstName="firstName",
@@ -84,6 +134,19 @@ def test_delete_coaches(client, auth, admin, coach, request):
     assert UserModel.find_by_id(user_id=coach.id) is None
 
 
+@pytest.mark.parametrize("defer_threshold", [0, 1000])
+def test_delete_coach_cascade(
+    app, client, auth, admin, coach, action_card_batches, defer_threshold, monkeypatch
+):
+    monkeypatch.setitem(app.config, "CASCADE_DELETE_DEFER_THRESHOLD", defer_threshold)
+    headers = auth.login(email="admin@test.com")
+
+    response = client.delete(f"/api/v1/coaches/{coach.id}", headers=headers)
+
+    assert response.status_code == 204
+    assert ActionCardBatchModel.find_action_card_batches_by_coach(coach.id).count() == 0
+
+
 def test_delete_inexisting_coach(client, auth, admin):
     headers = auth.login(email="admin@test.com")
     response = client.delete(f"/api/v1/coaches/inexistingId", headers=headers)
@@ -0,0 +1,85 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from app.models.action_card_model import ActionCardBatchModel, ActionCardModel
+from app.models.user_model import UserModel
+from app.models.workshop_model import WorkshopModel
+from app.schemas.action_card_schemas import (
+    ACTION_CARD_BATCH_PROJECTION,
+    ACTION_CARD_PROJECTION,
+    ActionCardBatchSchema,
+    ActionCardSchema,
+)
+from app.schemas.raw_dumps import (
+    dump_raw_action_card_batches,
+    dump_raw_action_cards,
+    dump_raw_coaches,
+    dump_raw_workshops,
+)
+from app.schemas.user_schemas import COACH_PROJECTION, CoachSchema
+from app.schemas.workshop_schemas import WORKSHOP_PROJECTION, WorkshopSchema
+
+
+def assert_same_output(queryset, projection, schema, dump_raw):
+    # Reference output, from the whole documents
+    expected = schema.dump(queryset)
+    output = dump_raw(queryset.only(*projection).as_pymongo())
+
+    assert output == expected
+    # Same keys in the same order
+    assert json.dumps(output) == json.dumps(expected)
+
+
+def test_dump_raw_coaches(admin, coaches):
+    assert_same_output(
+        UserModel.find_all_coaches().order_by("userId"),
+        COACH_PROJECTION,
+        CoachSchema(many=True),
+        dump_raw_coaches,
+    )
+
+
+def test_dump_raw_workshops(workshops, request):
+    # Workshop with the optional fields unset
+    workshop = WorkshopModel(
+        startAt=datetime(2020, 3, 3, 3, 3, 3, 3000),
+        coachId=workshops[0].coachId,
+        creatorId=workshops[0].creatorId,
+    )
+    workshop.save()
+    WorkshopModel.objects(workshopId=workshop.id).update(unset__eventUrl=True)
+    request.addfinalizer(workshop.delete)
+
+    assert_same_output(
+        WorkshopModel.objects.order_by("startAt"),
+        WORKSHOP_PROJECTION,
+        WorkshopSchema(many=True),
+        dump_raw_workshops,
+    )
+
+
+@pytest.mark.parametrize(
+    "model, projection, schema, dump_raw",
+    [
+        (
+            ActionCardModel,
+            ACTION_CARD_PROJECTION,
+            ActionCardSchema(many=True),
+            dump_raw_action_cards,
+        ),
+        (
+            ActionCardBatchModel,
+            ACTION_CARD_BATCH_PROJECTION,
+            ActionCardBatchSchema(many=True),
+            dump_raw_action_card_batches,
+        ),
+    ],
+)
+def test_dump_raw_action_cards(
+    action_card_batches, model, projection, schema, dump_raw
+):
+    assert_same_output(
+        model.objects.order_by("createdAt"), projection, schema, dump_raw
+    )
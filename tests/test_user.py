@@ -2,9 +2,14 @@ import datetime
 import json
 import time
 
-from flask_jwt_extended import create_access_token
-from werkzeug.security import check_password_hash
-
+import flask_jwt_extended.view_decorators
+import pytest
+from flask_jwt_extended import create_access_token, get_jti
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.common.cache import revoked_token_cache
+from app.common.cache.bloom_filter import BloomFilter
+from app.common.cache.user_cache import UserCache
 from app.common.errors import (
     EmailNotFoundError,
     ExpiredTokenError,
@@ -13,10 +18,19 @@ from app.common.errors import (
     InvalidTokenError,
     PermissionDeniedError,
     RevokedTokenError,
+    ServiceUnavailableError,
+    TooManyRequestsError,
     UnauthorizedTokenError,
 )
 from app.common.mail.schemas import password_reset_schema
-from app.models.user_model import UserModel
+from app.common.password_hasher import PasswordHasher, password_hasher
+from app.common.rate_limiter import (
+    MemoryRateLimitBackend,
+    MongoRateLimitBackend,
+    rate_limiter,
+)
+from app.models.rate_limit_model import RateLimitCounterModel
+from app.models.user_model import BlacklistTokenModel, Roles, UserModel
 
 
 def _get_authorization_header(token):
@@ -51,6 +65,107 @@ def test_unsuccessful_login_wrong_password(client, admin):
     assert status_code == InvalidPasswordError.code
 
 
+def test_login_upgrades_password_hash(client, db, request):
+    user = UserModel(
+        firstName="first_name",
+        lastName="last_name",
+        email="old_hash@test.com",
+        password=generate_password_hash("password", method="pbkdf2:sha256:1000"),
+        role=[Roles.COACH.value],
+    )
+    user.save()
+
+    data = {"email": "old_hash@test.com", "password": "password"}
+    response = client.post("api/v1/login", data=json.dumps(data))
+    user.reload()
+
+    assert response.status_code == 200
+    assert not password_hasher.needs_rehash(user.password)
+    assert check_password_hash(pwhash=user.password, password="password")
+
+    def teardown():
+        user.delete()
+
+    request.addfinalizer(teardown)
+
+
+def test_password_hasher_method_normalized(app, monkeypatch):
+    # Werkzeug's own spelling, stored as pbkdf2:sha256:<default iterations>
+    monkeypatch.setitem(app.config, "PASSWORD_HASH_METHOD", "pbkdf2:sha256")
+    hasher = PasswordHasher()
+    hasher.init_app(app)
+
+    pwhash = generate_password_hash("password", method="pbkdf2:sha256")
+    assert not hasher.needs_rehash(pwhash)
+    pwhash = generate_password_hash("password", method="pbkdf2:sha256:1000")
+    assert hasher.needs_rehash(pwhash)
+
+
+def test_login_when_password_hasher_is_saturated(client, admin, request):
+    # Take every slot of the pool
+    slots = 0
+    while password_hasher._slots.acquire(blocking=False):
+        slots += 1
+
+    def teardown():
+        for _ in range(slots):
+            password_hasher._slots.release()
+
+    request.addfinalizer(teardown)
+
+    data = {"email": "admin@test.com", "password": "password"}
+    response = client.post("api/v1/login", data=json.dumps(data))
+    response_data, status_code = json.loads(response.data), response.status_code
+
+    assert status_code == ServiceUnavailableError.code
+    assert response_data == ServiceUnavailableError().get_content()
+
+
+@pytest.mark.parametrize("backend", [MemoryRateLimitBackend, MongoRateLimitBackend])
+def test_login_rate_limited(app, client, admin, monkeypatch, request, backend):
+    monkeypatch.setitem(app.config, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setitem(
+        app.config, "RATE_LIMITS", {"login": {"email": 2, "address": 100}}
+    )
+    monkeypatch.setattr(rate_limiter, "backend", backend())
+
+    data = {"email": "admin@test.com", "password": "wrong_password"}
+    for _ in range(2):
+        response = client.post("api/v1/login", data=json.dumps(data))
+        assert response.status_code == InvalidPasswordError.code
+
+    response = client.post("api/v1/login", data=json.dumps(data))
+    response_data, status_code = json.loads(response.data), response.status_code
+    assert status_code == TooManyRequestsError.code
+    assert response_data == TooManyRequestsError().get_content()
+
+    # Other emails are not limited
+    data = {"email": "other_email@test.com", "password": "password"}
+    response = client.post("api/v1/login", data=json.dumps(data))
+    assert response.status_code == EmailNotFoundError.code
+
+    def teardown():
+        RateLimitCounterModel.objects().delete()
+
+    request.addfinalizer(teardown)
+
+
+def test_forgotten_password_rate_limited(app, client, mail, coach, monkeypatch):
+    monkeypatch.setitem(app.config, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setitem(
+        app.config, "RATE_LIMITS", {"forgotten_password": {"email": 100, "address": 1}}
+    )
+    monkeypatch.setattr(rate_limiter, "backend", MemoryRateLimitBackend())
+
+    with mail.record_messages() as outbox:
+        data = {"email": coach.email}
+        response = client.post("/api/v1/forgotten_password", data=json.dumps(data))
+        assert response.status_code == 204
+        response = client.post("/api/v1/forgotten_password", data=json.dumps(data))
+        assert response.status_code == TooManyRequestsError.code
+        assert len(outbox) == 1
+
+
 def test_succesful_logout(client, auth, admin):
     headers = auth.login(email="admin@test.com")
 
@@ -106,6 +221,67 @@ def test_with_revoked_token(client, auth, admin):
     assert status_code == RevokedTokenError.code
 
 
+def test_valid_token_does_not_query_blacklist(client, auth, admin, monkeypatch):
+    headers = auth.login(email="admin@test.com")
+
+    def is_jti_blacklisted(jti):
+        raise AssertionError("Blacklist should not be queried")
+
+    monkeypatch.setattr(BlacklistTokenModel, "is_jti_blacklisted", is_jti_blacklisted)
+    response = client.get("/api/v1/users/me", headers=headers)
+
+    assert response.status_code == 200
+
+
+# Token revoked by another worker, seen once the cache is refreshed
+def test_with_token_revoked_elsewhere(client, auth, admin, request):
+    headers = auth.login(email="admin@test.com")
+    jti = get_jti(headers["Authorization"].split()[1])
+    BlacklistTokenModel(token=jti).save(force_insert=True)
+
+    revoked_token_cache.refresh(force=True)
+    response = client.get("/api/v1/users/me", headers=headers)
+
+    response_data, status_code = json.loads(response.data), response.status_code
+    assert response_data == RevokedTokenError().get_content()
+    assert status_code == RevokedTokenError.code
+
+    def teardown():
+        BlacklistTokenModel.objects(token=jti).delete()
+
+    request.addfinalizer(teardown)
+
+
+def test_bloom_filter():
+    bloom_filter = BloomFilter(capacity=100, error_rate=0.01)
+    for i in range(100):
+        bloom_filter.add(f"jti_{i}")
+
+    assert all(f"jti_{i}" in bloom_filter for i in range(100))
+    false_positives = sum(f"other_jti_{i}" in bloom_filter for i in range(1000))
+    assert false_positives < 50
+
+
+def test_repeated_token_is_not_decoded_again(client, auth, admin, monkeypatch):
+    headers = auth.login(email="admin@test.com")
+    response = client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 200
+
+    def decode_token(*args, **kwargs):
+        raise AssertionError("Token should be taken from the cache")
+
+    monkeypatch.setattr(
+        flask_jwt_extended.view_decorators, "decode_token", decode_token
+    )
+    response = client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == 200
+
+    # Revoked token are still refused
+    auth.logout(headers)
+    response = client.get("/api/v1/users/me", headers=headers)
+    assert response.status_code == RevokedTokenError.code
+
+
 def test_access_level_too_low(client, auth, coach):
     headers = auth.login(email="coach@test.com")
 
@@ -126,6 +302,138 @@ def test_good_access_level(client, auth, coach):
     assert response.status_code == 200
 
 
+def test_current_user_is_cached(client, auth, coach, monkeypatch):
+    headers = auth.login(email="coach@test.com")
+    response = client.get("/api/v1/coaches", headers=headers)
+    assert response.status_code == 200
+
+    def find_by_id(user_id):
+        raise AssertionError("User should be cached")
+
+    monkeypatch.setattr(UserModel, "find_by_id", find_by_id)
+    response = client.get("/api/v1/coaches", headers=headers)
+
+    assert response.status_code == 200
+
+
+def test_cached_user_invalidated_on_save(client, auth, admin):
+    headers = auth.login(email="admin@test.com")
+    response = client.get("/api/v1/coaches", headers=headers)
+    assert response.status_code == 200
+
+    # Downgrade admin to coach
+    admin.role = [Roles.COACH.value]
+    admin.save()
+    response = client.post("/api/v1/coaches", headers=headers, data=json.dumps({}))
+
+    assert response.status_code == PermissionDeniedError.code
+
+
+def test_cached_user_invalidated_on_atomic_update(client, auth, coach):
+    headers = auth.login(email="coach@test.com")
+    response = client.get("/api/v1/coaches", headers=headers)
+    assert response.status_code == 200
+
+    coach.revoke_tokens()
+    response = client.get("/api/v1/coaches", headers=headers)
+
+    assert response.status_code == RevokedTokenError.code
+
+
+def test_revoked_tokens_seen_by_other_workers(app, coach, monkeypatch):
+    # User caches of two other workers, with and without a revalidation due
+    monkeypatch.setitem(
+        app.config, "USER_CACHE_REVALIDATE_INTERVAL", datetime.timedelta(0)
+    )
+    revalidated_cache = UserCache()
+    revalidated_cache.init_app(app)
+    monkeypatch.setitem(
+        app.config, "USER_CACHE_REVALIDATE_INTERVAL", datetime.timedelta(minutes=1)
+    )
+    stale_cache = UserCache()
+    stale_cache.init_app(app)
+    for cache in (revalidated_cache, stale_cache):
+        cache.set(coach.id, coach)
+        assert cache.get(coach.id) is coach
+
+    coach.revoke_tokens()
+
+    assert revalidated_cache.get(coach.id) is None
+    # Accepted staleness : until the next revalidation of the worker
+    assert stale_cache.get(coach.id) is coach
+
+
+def test_stateless_authorization(app, client, auth, coach, monkeypatch):
+    monkeypatch.setitem(app.config, "JWT_STATELESS_AUTHORIZATION", True)
+    headers = auth.login(email="coach@test.com")
+    # Revoked tokens check loads the user once in the user cache
+    response = client.get("/api/v1/coaches", headers=headers)
+    assert response.status_code == 200
+
+    def find_by_id(user_id):
+        raise AssertionError("User should not be loaded from DB")
+
+    monkeypatch.setattr(UserModel, "find_by_id", find_by_id)
+    response = client.get("/api/v1/coaches", headers=headers)
+    assert response.status_code == 200
+
+    # Try to access admin level endpoint
+    response = client.post("/api/v1/coaches", headers=headers, data=json.dumps({}))
+    response_data, status_code = json.loads(response.data), response.status_code
+    assert status_code == PermissionDeniedError.code
+    assert response_data == PermissionDeniedError().get_content()
+
+
+def test_stateless_authorization_deleted_coach(
+    app, client, auth, admin, coach, monkeypatch
+):
+    monkeypatch.setitem(app.config, "JWT_STATELESS_AUTHORIZATION", True)
+    coach_headers = auth.login(email="coach@test.com")
+    response = client.get("/api/v1/coaches", headers=coach_headers)
+    assert response.status_code == 200
+
+    response = client.delete(f"/api/v1/coaches/{coach.id}", headers=auth.login())
+    assert response.status_code == 204
+
+    # The token of the deleted coach must not be accepted anymore
+    response = client.get("/api/v1/coaches", headers=coach_headers)
+    assert response.status_code == RevokedTokenError.code
+
+
+def test_stateless_authorization_role_change(app, client, auth, admin, monkeypatch):
+    monkeypatch.setitem(app.config, "JWT_STATELESS_AUTHORIZATION", True)
+    user = UserModel(
+        email="future.coach@test.com",
+        firstName="first_name",
+        lastName="last_name",
+        password=generate_password_hash("password"),
+        role=[Roles.PARTICIPANT.value],
+    )
+    user.save()
+    user_headers = auth.login(email=user.email)
+    response = client.get("/api/v1/coaches", headers=user_headers)
+    assert response.status_code == PermissionDeniedError.code
+
+    data = {
+        "firstName": user.firstName,
+        "lastName": user.lastName,
+        "email": user.email,
+        "password": "password",
+        "role": "coach",
+        "city": "Paris",
+    }
+    response = client.post(
+        "/api/v1/coaches", headers=auth.login(), data=json.dumps(data)
+    )
+    assert response.status_code == 200
+
+    # The token carrying the previous access level must not be accepted anymore
+    response = client.get("/api/v1/coaches", headers=user_headers)
+    assert response.status_code == RevokedTokenError.code
+
+    user.delete()
+
+
 def test_forgotten_password_mail_sent(client, mail, coach):
     with mail.record_messages() as outbox:
         data = {"email": coach.email}
@@ -160,6 +468,35 @@ def test_reset_password(client, coach):
     assert check_password_hash(pwhash=coach.password, password="new_password")
 
 
+def test_reset_password_revokes_tokens(client, auth, coach):
+    headers = auth.login(email="coach@test.com")
+    token = coach.send_reset_password_mail()
+
+    data = {"password": "new_password"}
+    response = client.post(
+        "/api/v1/reset_password",
+        data=json.dumps(data),
+        query_string={"access_token": token},
+    )
+    assert response.status_code == 204
+
+    # Previous session is logged out
+    response = client.get("/api/v1/users/me", headers=headers)
+    response_data, status_code = json.loads(response.data), response.status_code
+    assert response_data == RevokedTokenError().get_content()
+    assert status_code == RevokedTokenError.code
+
+    # Reset link can't be used twice
+    response = client.post(
+        "/api/v1/reset_password",
+        data=json.dumps(data),
+        query_string={"access_token": token},
+    )
+    response_data, status_code = json.loads(response.data), response.status_code
+    assert response_data == InvalidTokenError().get_content()
+    assert status_code == InvalidTokenError.code
+
+
 def test_reset_password_invalid_token(client, coach):
     data = {"password": "new_d"}  # Password too short
 
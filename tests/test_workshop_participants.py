@@ -1,8 +1,9 @@
+import io
 import json
 
-from app.common.errors import InvalidDataError
+from app.common.errors import EntityNotFoundError, InvalidDataError
 from app.models.user_model import Roles, UserModel
-from app.models.workshop_model import WorkshopParticipantStatus
+from app.models.workshop_model import WorkshopModel, WorkshopParticipantStatus
 
 
 def test_add_participant_workshop(client, auth, coach, model, workshop, request):
@@ -32,6 +33,9 @@ def test_add_participant_workshop(client, auth, coach, model, workshop, request)
     assert workshop.id in new_participant.workshopParticipations
     assert new_participant.id in [p.user.id for p in workshop.participants]
     assert status == WorkshopParticipantStatus.CREATED.value
+    # Registering doesn't raise awareness, submitting the carbon form does
+    coach.reload()
+    assert not coach.awarenessRaisedCount
 
     def teardown():
         new_participant.delete()
@@ -113,6 +117,36 @@ def test_add_already_existing_participant_in_workshop(
     assert UserModel.find_by_email("participant2@test.com") is None
 
 
+def test_add_participant_created_concurrently(
+    client, auth, coach, workshop, participant, monkeypatch
+):
+    headers = auth.login(email="coach@test.com")
+    # The user gets created by another request after the first email lookup
+    find_by_email = UserModel.find_by_email
+    lookups = []
+
+    def find_by_email_late(email):
+        lookups.append(email)
+        return None if len(lookups) == 1 else find_by_email(email)
+
+    monkeypatch.setattr(UserModel, "find_by_email", find_by_email_late)
+    data = {"email": coach.email, "firstName": "first", "lastName": "last"}
+
+    response = client.post(
+        "/api/v1/workshops/{}/participants".format(workshop.workshopId),
+        headers=headers,
+        data=json.dumps(data),
+    )
+
+    assert response.status_code == 200
+    assert json.loads(response.data)["id"] == coach.id
+    workshop.reload()
+    assert workshop.get_participant_ids() == [participant.id, coach.id]
+    coach.reload()
+    assert workshop.id in coach.workshopParticipations
+    assert Roles.PARTICIPANT.value in coach.role
+
+
 def test_delete_participant_workshop(client, auth, coach, model, workshop, participant):
     headers = auth.login(email="coach@test.com")
 
@@ -127,3 +161,170 @@ def test_delete_participant_workshop(client, auth, coach, model, workshop, parti
     workshop.reload()
     assert status_code == 204
     assert participant.userId not in [p.user.id for p in workshop.participants]
+
+
+def test_add_participant_inexisting_workshop(client, auth, coach):
+    headers = auth.login(email="coach@test.com")
+    data = {
+        "email": "participant2@test.com",
+        "firstName": "participant_first_name_2",
+        "lastName": "participant_last_name_2",
+    }
+
+    response = client.post(
+        "/api/v1/workshops/inexistingId/participants",
+        headers=headers,
+        data=json.dumps(data),
+    )
+
+    assert response.status_code == EntityNotFoundError.code
+    assert UserModel.find_by_email("participant2@test.com") is None
+
+
+def test_delete_participant_inexisting_workshop(client, auth, coach, participant):
+    headers = auth.login(email="coach@test.com")
+
+    response = client.delete(
+        "/api/v1/workshops/inexistingId/participants/{}".format(participant.id),
+        headers=headers,
+    )
+
+    assert response.status_code == EntityNotFoundError.code
+
+
+def test_add_participants_bulk(client, auth, coach, workshop, participant, request):
+    headers = auth.login(email="coach@test.com")
+    data = [
+        dict(email="participant2@test.com", firstName="first", lastName="last"),
+        dict(email=participant.email, firstName="first", lastName="last"),
+        dict(email=coach.email, firstName="first", lastName="last"),
+        dict(email="participant3@test.com", firstName="first"),
+        dict(email="participant2@test.com", firstName="first", lastName="last"),
+    ]
+
+    response = client.post(
+        "/api/v1/workshops/{}/participants/bulk".format(workshop.id),
+        headers=headers,
+        data=json.dumps(data),
+        content_type="application/json",
+    )
+    new_participant = UserModel.find_by_email("participant2@test.com")
+    request.addfinalizer(new_participant.delete)
+
+    assert response.status_code == 200
+    response_data = json.loads(response.data)
+    assert [r["status"] for r in response_data] == [
+        WorkshopParticipantStatus.CREATED.value,
+        "alreadyregistered",
+        WorkshopParticipantStatus.CREATED.value,
+        "invalid",
+        "duplicate",
+    ]
+    assert response_data[0]["id"] == new_participant.id
+    assert "lastName" in response_data[3]["details"]
+
+    workshop.reload()
+    assert workshop.get_participant_ids() == [
+        participant.id,
+        new_participant.id,
+        coach.id,
+    ]
+    coach.reload()
+    assert Roles.PARTICIPANT.value in coach.role
+    assert coach.workshopParticipations == [workshop.id]
+    assert new_participant.workshopParticipations == [workshop.id]
+
+
+def test_add_participants_bulk_created_concurrently(
+    client, auth, coach, workshop, participant, monkeypatch, request
+):
+    headers = auth.login(email="coach@test.com")
+    # The users get created by another request after the email lookup
+    monkeypatch.setattr(UserModel, "find_by_emails", lambda emails: [])
+    data = [
+        dict(email=coach.email, firstName="first", lastName="last"),
+        dict(email="participant2@test.com", firstName="first", lastName="last"),
+    ]
+
+    response = client.post(
+        "/api/v1/workshops/{}/participants/bulk".format(workshop.id),
+        headers=headers,
+        data=json.dumps(data),
+        content_type="application/json",
+    )
+    new_participant = UserModel.find_by_email("participant2@test.com")
+    request.addfinalizer(new_participant.delete)
+
+    assert response.status_code == 200
+    assert [r["status"] for r in json.loads(response.data)] == [
+        "failed",
+        WorkshopParticipantStatus.CREATED.value,
+    ]
+    workshop.reload()
+    assert workshop.get_participant_ids() == [participant.id, new_participant.id]
+
+
+def test_add_participants_bulk_csv(client, auth, coach, workshop, request):
+    headers = auth.login(email="coach@test.com")
+    data = (
+        "email,firstName,lastName\n"
+        "participant2@test.com,first_2,last_2\n"
+        "participant3@test.com,first_3,last_3\n"
+    )
+
+    response = client.post(
+        "/api/v1/workshops/{}/participants/bulk".format(workshop.id),
+        headers=headers,
+        data={"file": (io.BytesIO(data.encode("utf-8")), "participants.csv")},
+        content_type="multipart/form-data",
+    )
+    new_participants = UserModel.find_by_emails(
+        ["participant2@test.com", "participant3@test.com"]
+    )
+    for new_participant in new_participants:
+        request.addfinalizer(new_participant.delete)
+
+    assert response.status_code == 200
+    assert [r["status"] for r in json.loads(response.data)] == [
+        WorkshopParticipantStatus.CREATED.value
+    ] * 2
+    workshop.reload()
+    assert len(workshop.participants) == 3
+    assert workshop.participants[2].firstName == "first_3"
+
+
+def test_fill_participant_snapshots(workshop, participant):
+    workshop = WorkshopModel.find_by_id(workshop.id, dereference=False)
+    assert workshop.participants[0].email is None
+
+    workshop.fill_participant_snapshots()
+
+    workshop_participant = workshop.participants[0]
+    assert workshop_participant.firstName == participant.firstName
+    assert workshop_participant.lastName == participant.lastName
+    assert workshop_participant.email == participant.email
+
+
+def test_sync_participant_snapshots(client, auth, coach, workshop, participant):
+    headers = auth.login(email="coach@test.com")
+    data = dict(email=participant.email, firstName="first_name", lastName="last_name")
+    other_workshop = WorkshopModel(
+        startAt=workshop.startAt, coachId=coach.id, creatorId=coach.id
+    )
+    other_workshop.save()
+    client.post(
+        f"/api/v1/workshops/{other_workshop.id}/participants",
+        headers=headers,
+        data=json.dumps(data),
+    )
+
+    participant.reload()
+    participant.firstName = "new_first_name"
+    participant.save()
+
+    other_workshop.reload()
+    workshop_participant = other_workshop.participants[0]
+    assert workshop_participant.firstName == "new_first_name"
+    assert workshop_participant.lastName == participant.lastName
+    assert workshop_participant.email == participant.email
+    other_workshop.delete()
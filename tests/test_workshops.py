@@ -1,10 +1,27 @@
 import json
+from datetime import datetime
 
 import pytest
+from flask import current_app
 from mongoengine import DoesNotExist
 
-from app.common.errors import EmptyBodyError, EntityNotFoundError
-from app.models.workshop_model import WorkshopModel
+from app.common.background_tasks import BackgroundTasks
+from app.common.cache import count_cache
+from app.common.errors import EmptyBodyError, EntityNotFoundError, InvalidDataError
+from app.common.pagination import decode_cursor, encode_cursor
+from app.models.action_card_model import (
+    ActionCardBatchModel,
+    ActionCardCategory,
+    ActionCardModel,
+    ActionCardType,
+)
+from app.models.carbon_forms_model import CarbonFormAnswersModel
+from app.models.user_model import Roles, UserModel
+from app.models.workshop_model import (
+    WorkshopModel,
+    WorkshopParticipantModel,
+    WorkshopParticipantStatus,
+)
 
 
 def test_get_workshops(client, auth, admin, workshops):
@@ -40,6 +57,83 @@ def test_get_workshops(client, auth, admin, workshops):
     assert expected_output == response_data
 
 
+def test_get_workshops_filtered(client, auth, admin, workshops):
+    workshop1, workshop2 = workshops[0], workshops[1]
+    headers = auth.login(email="admin@test.com")
+
+    response = client.get(
+        "/api/v1/workshops",
+        headers=headers,
+        query_string={"coachId": workshop2.coachId, "from": "2020-02-01T00:00:00Z"},
+    )
+    response_data = json.loads(response.data)
+    assert response.status_code == 200
+    assert [w["id"] for w in response_data] == [workshop2.id]
+
+    response = client.get(
+        "/api/v1/workshops",
+        headers=headers,
+        query_string={"to": "2020-02-01T00:00:00Z", "city": workshop1.city},
+    )
+    response_data = json.loads(response.data)
+    assert response.status_code == 200
+    assert [w["id"] for w in response_data] == [workshop1.id]
+
+
+def test_get_workshops_paginated(client, auth, admin, workshops):
+    workshop1, workshop2 = workshops[0], workshops[1]
+    headers = auth.login(email="admin@test.com")
+
+    response = client.get(
+        "/api/v1/workshops", headers=headers, query_string={"limit": 1}
+    )
+    assert response.status_code == 200
+    assert [w["id"] for w in json.loads(response.data)] == [workshop1.id]
+
+    response = client.get(
+        "/api/v1/workshops",
+        headers=headers,
+        query_string={"limit": 1, "cursor": response.headers["X-Next-Cursor"]},
+    )
+    assert response.status_code == 200
+    assert [w["id"] for w in json.loads(response.data)] == [workshop2.id]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_pagination_cursor_dates():
+    for value in (datetime(2020, 1, 1, 1, 1, 1), datetime(2020, 1, 1, 1, 1, 1, 5000)):
+        cursor = encode_cursor([value, "workshop_id"])
+        assert decode_cursor(cursor, 2) == [value, "workshop_id"]
+
+    with pytest.raises(InvalidDataError):
+        decode_cursor(encode_cursor([{"$date": "2020-01-01"}]), 1)
+
+
+def test_get_workshops_total_count(client, auth, admin, workshops):
+    count_cache.clear()
+    headers = auth.login(email="admin@test.com")
+
+    response = client.get(
+        "/api/v1/workshops",
+        headers=headers,
+        query_string={"limit": 1, "includeTotal": "true"},
+    )
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == str(len(workshops))
+
+    response = client.get(
+        "/api/v1/workshops",
+        headers=headers,
+        query_string={"includeTotal": "true", "city": workshops[0].city},
+    )
+    assert response.headers["X-Total-Count"] == str(
+        len([w for w in workshops if w.city == workshops[0].city])
+    )
+
+    response = client.get("/api/v1/workshops", headers=headers)
+    assert "X-Total-Count" not in response.headers
+
+
 def test_delete_workshop(client, auth, admin, request, workshops):
     workshop = workshops[0]
 
@@ -50,6 +144,33 @@ def test_delete_workshop(client, auth, admin, request, workshops):
     assert WorkshopModel.find_by_id(workshop.id) is None
 
 
+def test_delete_workshop_cascade(
+    app, client, auth, coach, workshop, participant, carbon_form_answers, monkeypatch
+):
+    monkeypatch.setitem(app.config, "CASCADE_DELETE_BATCH_SIZE", 1)
+    UserModel.inc_coach_stats(coach.id, awareness_raised=1)
+    headers = auth.login(email="coach@test.com")
+
+    response = client.delete(f"/api/v1/workshops/{workshop.id}", headers=headers)
+
+    assert response.status_code == 204
+    assert CarbonFormAnswersModel.find_all_by_workshop_id(workshop.id).count() == 0
+    coach.reload()
+    assert coach.awarenessRaisedCount == 0
+    participant.reload()
+    assert participant.workshopParticipations == []
+
+
+def test_background_tasks(app, monkeypatch):
+    tasks = BackgroundTasks()
+    monkeypatch.setitem(app.config, "BACKGROUND_TASKS_EAGER", False)
+    tasks.init_app(app)
+
+    future = tasks.submit(lambda: current_app.name)
+
+    assert future.result(timeout=5) == app.name
+
+
 def test_delete_inexisting_workshop(client, auth, admin):
     headers = auth.login(email="admin@test.com")
     response = client.delete(f"/api/v1/workshops/inexistingId", headers=headers)
@@ -68,6 +189,65 @@ def test_get_inexisting_workshop(client, auth, admin):
     assert response_data == EntityNotFoundError().get_content()
 
 
+def test_get_workshop_ordering(
+    client, auth, admin, coach, workshop, action_cards, action_card_batches, request
+):
+    # Inserted last, but first in the orderings
+    action_card0 = ActionCardModel(
+        cardNumber=0,
+        name="action_card_name_0",
+        category=ActionCardCategory.AWARENESS.value,
+        type=ActionCardType.INDIVIDUAL.value,
+        key="action_card_key_0",
+        sector="action_card_sector_0",
+        cost=0,
+    )
+    action_card0.save()
+    request.addfinalizer(action_card0.delete)
+    action_card_batch0 = ActionCardBatchModel(
+        coachId=coach.id,
+        name="action_card_batch_name_0",
+        type=ActionCardType.INDIVIDUAL.value,
+        actionCardIds=[action_card0.id],
+    )
+    action_card_batch0.save()
+    request.addfinalizer(action_card_batch0.delete)
+    # Participants keep the order they were added in, not an alphabetical one
+    participant0 = UserModel(
+        email="participant0@test.com",
+        firstName="participant_first_name_0",
+        lastName="participant_last_name_0",
+        role=[Roles.PARTICIPANT.value],
+    )
+    participant0.save()
+    request.addfinalizer(participant0.delete)
+    workshop.participants.append(
+        WorkshopParticipantModel(
+            user=participant0, status=WorkshopParticipantStatus.CREATED.value
+        )
+    )
+    workshop.save()
+    headers = auth.login(email="admin@test.com")
+
+    response = client.get(f"/api/v1/workshops/{workshop.id}", headers=headers)
+    response_data = json.loads(response.data)
+
+    # Same orders as the ones WorkshopDetailSchema used to sort in post_dump
+    action_cards = response_data["model"]["actionCards"]
+    assert action_cards == sorted(action_cards, key=lambda c: c["cardNumber"])
+    assert [c["cardNumber"] for c in action_cards] == [0, 1, 2, 3]
+    action_card_batches = response_data["model"]["actionCardBatches"]
+    assert action_card_batches == sorted(action_card_batches, key=lambda b: b["name"])
+    assert [b["name"] for b in action_card_batches] == [
+        "action_card_batch_name_0",
+        "action_card_batch_name_1",
+        "action_card_batch_name_2",
+    ]
+    assert [p["id"] for p in response_data["participants"]] == [
+        wp.user.id for wp in workshop.participants
+    ]
+
+
 def test_post_workshop_success(client, auth, admin, coach, model, request):
 
     data = dict(
@@ -85,6 +265,8 @@ def test_post_workshop_success(client, auth, admin, coach, model, request):
     response_data, status_code = json.loads(response.data), response.status_code
     assert status_code == 200
     assert len(WorkshopModel.objects()) == 1
+    coach.reload()
+    assert coach.workshopsCount == 1
 
     def teardown():
         workshop = WorkshopModel.find_by_id(response_data["id"])